@@ -28,8 +28,27 @@ from tkinter import messagebox
 from tkinter import colorchooser
 from tkinter import Menu, Event
 from tkinter import simpledialog
+from tkinter import filedialog
 
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
 from sys import platform
+from time import perf_counter
+from output_map import LAYOUTS
+from encoder import new_frame
+from crate_file import CrateWriter, CODEC_DELTA
+from importer import downsample, open_source, resample
+from sender import FrameSender, parse_target
+from color import ColorPipeline, CHANNEL_ORDERS, output_pipeline
+from tools import TOOLS, line, rectangle, flood_fill
+from playback import Player, Restartable
+from codec import changed_cells
+import effects
+import model
+import project
 if platform == "linux" or platform == "linux2" or platform == "win32":
     from tkinter import Button # TODO: test on these platforms
     borderless_option = {}
@@ -77,231 +96,623 @@ def get_scrollable_frame(master, w: int, h: int) -> tuple[ttk.Frame, ttk.Frame]:
 
     return containing_frame, scrollable_frame
 
-class Wall:
+def to_hex(color:tuple) -> str:
+    return "#" + bytes(color).hex()
+
+class Crate(model.Crate):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.drawn = False # already on the canvas of the wall
+
+    def set_index(self):
+        idx = simpledialog.askinteger(title="Crate index in the chain of crates", prompt="Type current crate index (-1 to exclude from the chain): ", minvalue=-1, maxvalue=self.max_index)
+        if not idx is None and self.assign_index(idx):
+            try:
+                self.wall.output_map()
+            except ValueError as e:
+                messagebox.showwarning(message=str(e))
+        self.wall.update_crate_state(self)
+
+class Import:
+    # an image or animation imported onto a Wall from the mainloop: Tk decodes the frames on the main thread, one per
+    # step, a process pool downsamples them, and the results are taken in order, the first one onto the wall and every
+    # frame of an animation into a multi-frame .crate
+    poll_interval = 20 # ms between steps while waiting for the pool
+
+    def __init__(self, wall:"Wall", path:str) -> None:
+        self.wall = wall
+        self.path = path
+        self.frames = open_source(path, wall.container)
+        self.workers = os.cpu_count() or 1
+        # spawned workers, a forked copy of the Tk process must never run
+        self.pool = ProcessPoolExecutor(self.workers, mp_context=get_context("spawn"))
+        self.pending = deque() # futures of the downsampled frames, in order
+        self.exhausted = False # every frame of the source is submitted
+        self.count = 0         # frames taken from the pool
+        self.encoder = None
+        self.writer = None     # .crate of an animation, once there is a second frame
+        self.animation = None
+
+    def step(self) -> None:
+        if self.pool is None:
+            return # cancelled
+        try:
+            if not self.exhausted and len(self.pending) < 2 * self.workers:
+                frame = next(self.frames, None)
+                if frame is None:
+                    self.exhausted = True
+                else:
+                    rgb, width, height = frame
+                    self.pending.append(self.pool.submit(downsample, rgb, width, height, self.wall.leds_wide, self.wall.leds_high))
+            while self.pending and self.pending[0].done():
+                self.take(self.pending.popleft().result())
+                if self.pool is None:
+                    return
+        except (tk.TclError, ValueError, OSError, BrokenProcessPool) as e:
+            self.finish(error=f"Could not import {self.path}: {e}")
+            return
+        if self.exhausted and not self.pending:
+            if not self.count:
+                self.finish(error=f"Could not import {self.path}: it has no frames")
+            elif self.writer is not None:
+                self.finish(info=f"Saved {len(self.writer)} frames to {self.writer.path}")
+            else:
+                self.finish()
+            return
+        # decoding goes on at once while the pool has room, otherwise the results are polled
+        self.wall.canvas.after(1 if not self.exhausted and len(self.pending) < 2 * self.workers else self.poll_interval, self.step)
+
+    def take(self, rgb:bytes) -> None:
+        self.count += 1
+        if self.count == 1:
+            self.wall.load_frame(rgb)
+            return
+        if self.writer is None:
+            # animated source, store every frame in a multi-frame .crate
+            self.encoder = self.wall.encoder()
+            if not len(self.encoder):
+                self.finish(info="Index the crates of the wall to save the animation")
+                return
+            self.animation = new_frame(len(self.wall.items))
+            self.writer = CrateWriter(f"{self.wall.file_name()}_animation.crate", self.wall.width, self.wall.height, self.wall.crate_width, self.wall.crate_height, len(self.encoder), codec=CODEC_DELTA)
+            self.writer.write(self.encoder.encode(self.wall.frame))
+        self.animation[:len(rgb)] = rgb
+        self.writer.write(self.encoder.encode(self.animation))
+
+    def cancel(self) -> None:
+        self.finish()
+
+    def finish(self, error:str|None=None, info:str|None=None) -> None:
+        if self.pool is None:
+            return
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.pool = None
+        self.frames.close()
+        if self.writer is not None:
+            self.writer.close()
+        self.wall.imported()
+        if error is not None:
+            messagebox.showerror(message=error)
+        elif info is not None:
+            messagebox.showinfo(message=info)
+
+class Wall(model.Wall):
+    crate_class = Crate
+    pixel_size = 12   # size of a single LED on the canvas, in screen pixels
+    pixel_gap = 2     # gap between LEDs of the same crate
+    crate_gap = 6     # gap between neighbouring crates
+    batch_size = 2000 # LEDs drawn at once before the mainloop gets control back
+    preview_fps = 10  # canvas updates per second during playback, independent of the output rate
+    send_fps = 30     # pace of the sender while painting, during playback the player paces the frames instead
+    sender_poll_interval = 500 # ms between checks of the connection
+
     def __init__(self, name:str, container:tk.Frame, content:tk.Frame, width:int, height:int, crate_width:int, crate_height:int, crate_layout:str) -> None:
-        self.name = name
+        super().__init__(name, width, height, crate_width, crate_height, crate_layout)
         self.container = container
         self.content = content
-        self.width = width
-        self.height = height
-        self.crate_height = crate_height
-        self.crate_width = crate_width
-        self.crate_layout = crate_layout
-        
+
         self.palette = tk.Frame(self.container, width=50, height=100, borderwidth=1, relief="solid")
-        self.current_color = [((128, 0, 128), "#52b4d8")]
-        self.color_button = Button(self.palette, text="Select Color", command=self.select_color, bg=self.current_color[0][-1], **borderless_option)
+        self.color_button = Button(self.palette, text="Select Color", command=self.select_color, bg=to_hex(self.color), **borderless_option)
         self.color_button.pack()
 
         self.save_button = Button(self.palette, text="Save", command=self.save, bg="white", **borderless_option)
         self.save_button.pack()
 
-        self.crates = []
+        self.import_button = Button(self.palette, text="Import", command=self.import_file, bg="white", **borderless_option)
+        self.import_button.pack()
+        self.importing = None # import in progress, frames are downsampled in a process pool
+
+        self.send_button = Button(self.palette, text="Send", command=self.send, bg="white", **borderless_option)
+        self.send_button.pack()
+        self.sender = None # once connected, every change of the wall is sent immediately
+
+        self.output_button = Button(self.palette, text="Output", command=self.output_settings, bg="white", **borderless_option)
+        self.output_button.pack()
+
+        self.play_button = Button(self.palette, text="Play", command=self.play, bg="white", **borderless_option)
+        self.play_button.pack()
+        self.player = None    # plays effects or frame files to the sender, the canvas only previews them
+        self.shown = None     # colors on the canvas during playback
+        self.shown_index = -1 # index of the played frame on the canvas
+        self.overlay = ()     # canvas items showing the playback metrics
+
+        # painting tools, every operation is applied as one batch and recorded in the undo journal
+        self.tool = tk.StringVar(self.palette, "Brush")
+        for tool in TOOLS:
+            tk.Radiobutton(self.palette, text=tool, value=tool, variable=self.tool).pack(anchor="w")
+        self.undo_button = Button(self.palette, text="Undo", command=self.undo, bg="white", **borderless_option)
+        self.undo_button.pack()
+        self.redo_button = Button(self.palette, text="Redo", command=self.redo, bg="white", **borderless_option)
+        self.redo_button.pack()
+        self.anchor = None  # LED where the current drag started
+        self.preview = None # canvas item outlining a line or rectangle while it is dragged
+        self.redraw_cells = set() # cells waiting for the coalesced redraw
+
+        self.progress = ttk.Progressbar(self.palette, orient="horizontal", mode="determinate", length=80)
+
+        # all crates and pixels of the wall are items of a single canvas
+        self.pixel_pitch = self.pixel_size + self.pixel_gap
+        self.crate_pitch_x = self.crate_width * self.pixel_pitch + self.crate_gap
+        self.crate_pitch_y = self.crate_height * self.pixel_pitch + self.crate_gap
+        self.canvas = tk.Canvas(self.content, width=self.width * self.crate_pitch_x, height=self.height * self.crate_pitch_y, bg="#ffffff", highlightthickness=0)
+        self.canvas.pack()
+        self.items = [] # canvas item of every LED, same indexing as frame
 
         self.palette.pack(side="left")
-        for x in range(self.width):
-            for y in range(self.height):
-                self.crates.append(Crate(self.content, self.crate_width, self.crate_height, self.crate_layout, self.current_color, y, x, self.width * self.height))
+        self.draw()
+
+        # a single context menu for all crates, filled in for the crate it is opened on
+        self.menu_crate = None
+        self.menu_extra_pixel = tk.IntVar(self.canvas)
+        self.menu_layout = tk.StringVar(self.canvas)
+        self.menu = Menu(self.canvas, tearoff=0)
+        self.menu.add_checkbutton(label="Extra pixel", variable=self.menu_extra_pixel, command=lambda: self.menu_crate.set_extra_pixel(bool(self.menu_extra_pixel.get())))
+        self.menu.add_separator()
+        self.menu.add_command(label="Set Index", command=lambda: self.menu_crate.set_index())
+        self.menu.add_separator()
+        for layout in LAYOUTS:
+            self.menu.add_radiobutton(label=layout, value=layout, variable=self.menu_layout, command=lambda: self.menu_crate.change_layout(self.menu_layout.get()))
+
+        self.canvas.bind("<Button-1>", self.press)
+        self.canvas.bind("<B1-Motion>", self.drag)
+        self.canvas.bind("<ButtonRelease-1>", self.release)
+        self.canvas.bind("<Control-z>", lambda e: self.undo())
+        self.canvas.bind("<Control-y>", lambda e: self.redo())
+        self.canvas.bind("<Button-2>" if platform == "darwin" else "<Button-3>", self.popup) # TODO: test on these platforms
+
+    def draw(self) -> None:
+        # crates are drawn in batches from the mainloop, so the tab shows up and stays responsive while a large wall is built
+        self.canvas.delete("all")
+        self.items = [0] * (self.leds_wide * self.leds_high)
+        for crate in self.crates:
+            crate.drawn = False
+        self.progress.configure(maximum=len(self.crates), value=0)
+        self.progress.pack()
+        self.canvas.after_idle(self.draw_batch, 0)
+
+    def draw_batch(self, start:int) -> None:
+        stop = start
+        drawn = 0
+        while stop < len(self.crates) and drawn < self.batch_size:
+            self.draw_crate(self.crates[stop])
+            drawn += self.crate_width * self.crate_height
+            stop += 1
+        self.progress.configure(value=stop)
+        if stop < len(self.crates):
+            self.canvas.after(1, self.draw_batch, stop)
+        else:
+            self.progress.pack_forget()
+
+    def draw_crate(self, crate) -> None:
+        x0 = crate.col * self.crate_pitch_x
+        y0 = crate.row * self.crate_pitch_y
+        state = "disabled" if crate.idx < 0 else "normal"
+        self.canvas.create_rectangle(x0, y0, x0 + self.crate_pitch_x - self.crate_gap, y0 + self.crate_pitch_y - self.crate_gap, outline="#000000")
+        for y in range(crate.height):
+            py = y0 + y * self.pixel_pitch + self.pixel_gap // 2
+            for x in range(crate.width):
+                px = x0 + x * self.pixel_pitch + self.pixel_gap // 2
+                cell = self.cell(crate, x, y)
+                self.items[cell] = self.canvas.create_rectangle(px, py, px + self.pixel_size, py + self.pixel_size, fill=self.hex_color(cell), outline="#000000", disabledstipple="gray50", state=state)
+        crate.drawn = True
+
+    def hex_color(self, cell:int) -> str:
+        return "#" + self.frame[3 * cell:3 * cell + 3].hex()
+
+    def load_frame(self, rgb:bytes) -> list[int]:
+        # only cells that change are redrawn
+        cells = super().load_frame(rgb)
+        self.changed(cells)
+        return cells
+
+    def changed(self, cells) -> None:
+        # one model write is done, mark the crates, schedule a single redraw and send the frame once
+        if not len(cells):
+            return
+        self.dirty.update(self.crate_at(cell) for cell in cells)
+        if not self.redraw_cells:
+            self.canvas.after_idle(self.redraw)
+        self.redraw_cells.update(cells)
+        if self.sender is not None:
+            self.send_frame()
+
+    def redraw(self) -> None:
+        self.recolor(self.redraw_cells, self.frame)
+        self.redraw_cells.clear()
+
+    def recolor(self, cells, frame) -> None:
+        # one Tcl call per color instead of one itemconfigure per LED
+        by_color = {}
+        for cell in cells:
+            if self.items[cell]:
+                by_color.setdefault("#" + frame[3 * cell:3 * cell + 3].hex(), []).append(self.items[cell])
+        for color, items in by_color.items():
+            self.canvas.tk.call("foreach", "item", items, f"{self.canvas._w} itemconfigure $item -fill {color}")
+
+    def paintable(self) -> bytearray:
+        # 1 for every LED of an enabled crate that is already on the canvas
+        mask = bytearray(self.leds_wide * self.leds_high)
+        row = b"\1" * self.crate_width
+        for crate in self.crates:
+            if crate.idx >= 0 and crate.drawn:
+                for y in range(crate.height):
+                    start = self.cell(crate, 0, y)
+                    mask[start:start + crate.width] = row
+        return mask
+
+    def hit_test(self, event:Event):
+        # map canvas coordinates to (crate, x, y) arithmetically, None if the point is in a gap between crates
+        cx = int(self.canvas.canvasx(event.x))
+        cy = int(self.canvas.canvasy(event.y))
+        if cx < 0 or cy < 0:
+            return None
+        col, rx = divmod(cx, self.crate_pitch_x)
+        row, ry = divmod(cy, self.crate_pitch_y)
+        if col >= self.width or row >= self.height:
+            return None
+        x = rx // self.pixel_pitch
+        y = ry // self.pixel_pitch
+        if x >= self.crate_width or y >= self.crate_height:
+            return None
+        return self.crates[row + col * self.height], x, y
+
+    def led_at(self, event:Event) -> tuple[int, int]:
+        # LED of the wall nearest to the cursor, clamped to the wall, so drags may cross gaps and leave the canvas
+        cx = max(0, int(self.canvas.canvasx(event.x)))
+        cy = max(0, int(self.canvas.canvasy(event.y)))
+        col, rx = divmod(cx, self.crate_pitch_x)
+        row, ry = divmod(cy, self.crate_pitch_y)
+        x = col * self.crate_width + min(rx // self.pixel_pitch, self.crate_width - 1)
+        y = row * self.crate_height + min(ry // self.pixel_pitch, self.crate_height - 1)
+        return min(x, self.leds_wide - 1), min(y, self.leds_high - 1)
+
+    def led_center(self, x:int, y:int) -> tuple[int, int]:
+        return (x // self.crate_width * self.crate_pitch_x + x % self.crate_width * self.pixel_pitch + self.pixel_pitch // 2,
+                y // self.crate_height * self.crate_pitch_y + y % self.crate_height * self.pixel_pitch + self.pixel_pitch // 2)
+
+    def paint(self, cells) -> None:
+        mask = self.paintable()
+        self.changed(self.journal.paint(self.frame, [cell for cell in cells if mask[cell]], bytes(self.color)))
+
+    def press(self, event:Event) -> None:
+        self.canvas.focus_set() # for the undo and redo shortcuts
+        if self.player is not None or self.hit_test(event) is None:
+            return
+        x, y = self.anchor = self.led_at(event)
+        leds_wide = self.leds_wide
+        tool = self.tool.get()
+        if tool == "Brush":
+            self.journal.begin_stroke()
+            self.paint([x + y * leds_wide])
+        elif tool == "Fill":
+            mask = self.paintable()
+            if mask[x + y * leds_wide]:
+                self.paint(flood_fill(self.frame, leds_wide, self.leds_high, x, y, mask))
+            self.anchor = None
+        else:
+            cx, cy = self.led_center(x, y)
+            if tool == "Line":
+                self.preview = self.canvas.create_line(cx, cy, cx, cy, fill=to_hex(self.color), width=3)
+            else:
+                self.preview = self.canvas.create_rectangle(cx, cy, cx, cy, outline=to_hex(self.color), width=3, dash=(4, 2))
+
+    def drag(self, event:Event) -> None:
+        if self.anchor is None:
+            return
+        x, y = self.led_at(event)
+        if self.preview is not None:
+            self.canvas.coords(self.preview, *self.led_center(*self.anchor), *self.led_center(x, y))
+        else:
+            self.paint(line(*self.anchor, x, y, self.leds_wide))
+            self.anchor = (x, y)
+
+    def release(self, event:Event) -> None:
+        if self.anchor is None:
+            return
+        x, y = self.led_at(event)
+        if self.preview is not None:
+            self.canvas.delete(self.preview)
+            self.preview = None
+            shape = line if self.tool.get() == "Line" else rectangle
+            self.paint(shape(*self.anchor, x, y, self.leds_wide))
+        self.journal.end_stroke()
+        self.anchor = None
+
+    def undo(self) -> None:
+        if self.anchor is None and self.player is None:
+            self.changed(self.journal.undo(self.frame) or ())
+
+    def redo(self) -> None:
+        if self.anchor is None and self.player is None:
+            self.changed(self.journal.redo(self.frame) or ())
+
+    def popup(self, event:Event) -> None:
+        # indices and layouts are fixed during playback, the player keeps the encoder it was started with
+        hit = self.hit_test(event)
+        if self.player is not None or hit is None:
+            return
+        self.menu_crate = crate = hit[0]
+        self.menu_extra_pixel.set(int(crate.extra_pixel))
+        self.menu_layout.set(crate.layout)
+        self.menu.entryconfigure(2, label=f"Set Index (current {crate.idx})")
+        try:
+            self.menu.tk_popup(event.x_root, event.y_root)
+        finally:
+            self.menu.grab_release()
+
+    def update_crate_state(self, crate) -> None:
+        if not crate.drawn:
+            return
+        state = "disabled" if crate.idx < 0 else "normal"
+        for y in range(crate.height):
+            for x in range(crate.width):
+                self.canvas.itemconfigure(self.items[self.cell(crate, x, y)], state=state)
 
     def select_color(self):
-        self.current_color[0] = colorchooser.askcolor(title ="Palette")
-        self.color_button.configure(bg=self.current_color[0][-1])
-        # for crate in self.crates:
-        #     print(crate.color_grid)
-
-    def save(self):
-        output = b""
-        for crate in sorted(self.crates):
-            if crate.idx < 0:
-                continue
-            for color in crate.color_grid:
-                output += bytes(color[0])
-        with open(f"./{self.name}_w{self.width}_h{self.height}_cw{self.crate_width}_ch{self.crate_height}.crate", "wb+") as f:
-            print(output)
-            f.write(output)
-
-    def __del__(self) -> None:
-        self.container.destroy()
-
-class Crate:
-    def __init__(self, parent, width:int, height:int, layout:str, current_color:tuple, row:int, col:int, max_index:int, extra_pixel=0) -> None:
-        self.width = width
-        self.height = height
-        self.layout = layout
-        self.current_color = current_color
-        self.row = row
-        self.col = col
-        self.idx = -1 # TODO: let user set index of the crate in the chain of crates
-        self.body = tk.Frame(parent, width=40, height=30, borderwidth=1, relief="solid", bg="#ffffff")
-        self.body.grid(row=row, column=col, padx=1, pady=1)
-        self.extra_pixel = tk.IntVar(value=1)
-        self.max_index = max_index
-        self.color_grid = list(((0, 0, 0), "#000000") for x in range(height * width + self.extra_pixel.get())) # stored values that shall be sent to the arduino after preps
-        self.pixel_grid = []                                                                                         # representation of stored values in this app
-        for y in range(self.height):
-            for x in range(self.width):
-                self.pixel_grid.append(Pixel(self.body, 10, 10, self.current_color, self.color_grid, y, x))
-        self.change_layout(self.layout)
-
-        def manage_extra_pixel():
-            if self.extra_pixel.get():
-                self.color_grid.append(((0, 0, 0), "#000000"))
+        color = colorchooser.askcolor(title ="Palette")
+        if color[0] is None:
+            return
+        self.color = color[0]
+        self.color_button.configure(bg=color[-1])
+        self.header_dirty = True
+
+    def output_settings(self) -> None:
+        if self.player is not None:
+            return
+        window = tk.Toplevel(self.container)
+        window.title(f"{self.name} Output")
+        pipeline = self.pipeline or ColorPipeline(gamma=1.0)
+
+        order = tk.StringVar(window, self.channel_order)
+        ttk.Label(window, text="Channel order").grid(row=0, column=0)
+        tk.OptionMenu(window, order, *CHANNEL_ORDERS).grid(row=0, column=1)
+
+        ttk.Label(window, text="Gamma").grid(row=1, column=0)
+        ent_gamma = ttk.Entry(window)
+        ent_gamma.insert(0, str(pipeline.gamma))
+        ent_gamma.grid(row=1, column=1)
+
+        ttk.Label(window, text="Brightness, %").grid(row=2, column=0)
+        scl_brightness = tk.Scale(window, from_=0, to=100, orient="horizontal")
+        scl_brightness.set(round(100 * pipeline.brightness))
+        scl_brightness.grid(row=2, column=1)
+
+        ttk.Label(window, text="Power limit, A (0 - off)").grid(row=3, column=0)
+        ent_amps = ttk.Entry(window)
+        ent_amps.insert(0, str(pipeline.max_amps))
+        ent_amps.grid(row=3, column=1)
+
+        def apply():
+            try:
+                gamma = float(ent_gamma.get())
+                max_amps = float(ent_amps.get())
+                if gamma <= 0 or max_amps < 0:
+                    raise ValueError()
+            except ValueError:
+                messagebox.showerror(message="Gamma must be positive and the power limit must not be negative", parent=window)
+                return
+            brightness = scl_brightness.get() / 100
+            self.set_output(order.get(), output_pipeline(gamma, brightness, max_amps))
+            self.header_dirty = True
+            window.destroy()
+        Button(window, text="Apply", command=apply, bg="white", **borderless_option).grid(row=4, column=0, columnspan=2)
+
+    def restore(self, snapshot:project.WallSnapshot) -> None:
+        # state of a loaded project, applied before the crates are drawn
+        super().restore(snapshot)
+        self.color_button.configure(bg=to_hex(self.color))
+
+    def save(self, path:str|None=None):
+        try:
+            return super().save(path)
+        except ValueError as e:
+            messagebox.showerror(message=str(e))
+
+    def send(self):
+        if self.sender is not None:
+            self.disconnect()
+            return
+        target = simpledialog.askstring(title="Send", prompt="Receiver address ([udp://|tcp://]host[:port]): ", initialvalue="udp://raspberrypi.local")
+        if not target:
+            return
+        try:
+            protocol, host, port = parse_target(target)
+            self.sender = FrameSender(host, port, fps=self.send_fps, protocol=protocol)
+        except ValueError as e:
+            messagebox.showerror(message=str(e))
+            return
+        self.sender.start()
+        self.send_button.configure(text="Stop")
+        self.send_frame()
+        self.canvas.after(self.sender_poll_interval, self.check_sender)
+
+    def check_sender(self) -> None:
+        # a connection that failed, or broke later, is reported once and dropped
+        if self.sender is None:
+            return
+        if not self.sender.running():
+            sender = self.sender
+            self.disconnect()
+            messagebox.showerror(message=f"Sending to {sender.host}:{sender.port} stopped: {sender.error}")
+            return
+        self.canvas.after(self.sender_poll_interval, self.check_sender)
+
+    def disconnect(self) -> None:
+        # playback hands its frames to this sender, so it stops first
+        sender, self.sender = self.sender, None
+        if self.player is not None:
+            self.stop_playback()
+        sender.stop()
+        self.send_button.configure(text="Send")
+
+    def reconnect(self, fps:float) -> None:
+        # the sender paces at a fixed rate from its start, so a different pace needs a new one to the same receiver
+        sender = self.sender
+        sender.stop()
+        self.sender = FrameSender(sender.host, sender.port, fps=fps, protocol=sender.protocol)
+        self.sender.start()
+
+    def send_frame(self) -> None:
+        if not self.sender.running():
+            return # check_sender reports it
+        try:
+            self.sender.submit(self.encoder().encode(self.frame))
+        except ValueError:
+            pass # duplicate crate indices, already reported by set_index
+
+    def import_file(self):
+        if self.importing is not None:
+            self.importing.cancel()
+            return
+        if self.player is not None:
+            return # the imported frame would be sent in the middle of the show
+        path = filedialog.askopenfilename(title="Import", filetypes=[("Images", "*.png *.gif *.ppm *.pnm"), ("All files", "*")])
+        if not path:
+            return
+        self.importing = Import(self, path)
+        self.import_button.configure(text="Cancel")
+        self.importing.step()
+
+    def imported(self) -> None:
+        self.importing = None
+        self.import_button.configure(text="Import")
+
+    def play(self) -> None:
+        if self.player is not None:
+            self.stop_playback()
+            return
+        if self.importing is not None:
+            messagebox.showinfo(message="Wait for the import to finish, or cancel it")
+            return
+        window = tk.Toplevel(self.container)
+        window.title(f"{self.name} Play")
+
+        source = tk.StringVar(window, "plasma")
+        ttk.Label(window, text="Source").grid(row=0, column=0)
+        tk.OptionMenu(window, source, *effects.EFFECTS, "PPM file...").grid(row=0, column=1)
+
+        ttk.Label(window, text="Frames per second").grid(row=1, column=0)
+        ent_fps = ttk.Entry(window)
+        ent_fps.insert(0, "30")
+        ent_fps.grid(row=1, column=1)
+
+        repeat = tk.IntVar(window, 1)
+        tk.Checkbutton(window, text="Loop the file", variable=repeat).grid(row=2, column=0, columnspan=2)
+
+        def start():
+            try:
+                fps = float(ent_fps.get())
+                if fps <= 0:
+                    raise ValueError()
+            except ValueError:
+                messagebox.showerror(message="Frames per second must be positive", parent=window)
+                return
+            if source.get() in effects.EFFECTS:
+                frames = effects.frames(effects.create(source.get(), self.leds_wide, self.leds_high), fps)
             else:
-                self.color_grid.pop()
-
-        # add context menu
-        menu = Menu(self.body, tearoff=0)
-        menu.add_checkbutton(label="Extra pixel", variable=self.extra_pixel, command=manage_extra_pixel)
-        menu.add_separator()
-        menu.add_command(label=f"Set Index (current {self.idx})", command=lambda: self.set_index(menu))
-        menu.add_separator()
-        menu.add_command(label="Layout1", command=lambda: self.change_layout("Layout1"))
-        menu.add_command(label="Layout2", command=lambda: self.change_layout("Layout2"))
-        menu.add_command(label="Layout3", command=lambda: self.change_layout("Layout3"))
-        menu.add_command(label="Layout4", command=lambda: self.change_layout("Layout3"))
-        menu.add_command(label="Layout5", command=lambda: self.change_layout("Layout5"))
-        menu.add_command(label="Layout6", command=lambda: self.change_layout("Layout6"))
-        menu.add_command(label="Layout7", command=lambda: self.change_layout("Layout7"))
-        menu.add_command(label="Layout8", command=lambda: self.change_layout("Layout8"))
-
-        def do_popup(event:Event):
+                # frames are decoded on the player's thread, so only formats that do not need Tk
+                path = filedialog.askopenfilename(parent=window, title="Play", filetypes=[("PPM frames", "*.ppm *.pnm"), ("All files", "*")])
+                if not path:
+                    return
+                if not path.lower().endswith((".ppm", ".pnm")):
+                    messagebox.showerror(message="Only PPM frames can be played, convert other formats with ffmpeg", parent=window)
+                    return
+                frames = Restartable(lambda: resample(open_source(path), self.leds_wide, self.leds_high, workers=1))
+            window.destroy()
+            self.start_playback(frames, fps, bool(repeat.get()))
+        Button(window, text="Start", command=start, bg="white", **borderless_option).grid(row=3, column=0, columnspan=2)
+
+    def start_playback(self, frames, fps:float, repeat:bool) -> None:
+        encoder = None
+        if self.sender is not None:
             try:
-                menu.tk_popup(event.x_root, event.y_root)
-            finally:
-                menu.grab_release()
-        self.body.bind("<Button-2>" if platform == "darwin" else "<Button-3>", do_popup) # TODO: test on these platforms
-
-    def set_index(self, menu:Menu):
-        idx = simpledialog.askinteger(title="Crate index in the chain of crates", prompt="Type current crate index (-1 to exclude from the chain): ", minvalue=-1, maxvalue=self.max_index)
-        if not idx is None:
-            self.idx = idx
-        if (self.idx < 0):
-            for pixel in self.pixel_grid:
-                pixel.button.configure(state="disabled")
-        else:
-            for pixel in self.pixel_grid:
-                pixel.button.configure(state="normal")
-        menu.entryconfigure(2, label=f"Set Index (current {self.idx})")
-
-    def change_layout(self, layout:str):
-        # print(f"changing layout from {self.layout} to {layout}")
-        self.layout = layout
-        idx = 0
-        even = True
-        match self.layout:
-            case "Layout1":                                     # horisontal (V)
-                for y in range(self.height-1, -1, -1):          # bottom->top
-                    if even:
-                        for x in range(0, self.width, 1):       # left->right
-                            self.pixel_grid[x + self.width*y].idx = idx
-                            idx += 1
-                    else:
-                        for x in range(self.width-1, -1, -1):   # right->left
-                            self.pixel_grid[x + self.width*y].idx = idx
-                            idx += 1
-                    even = not even
-            case "Layout2":                                     # horisontal (V)
-                for y in range(0, self.height, 1):              # top->bottom
-                    if even:
-                        for x in range(0, self.width, 1):       # left->right
-                            self.pixel_grid[x + self.width*y].idx = idx
-                            idx += 1
-                    else:
-                        for x in range(self.width-1, -1, -1):   # right->left
-                            self.pixel_grid[x + self.width*y].idx = idx
-                            idx += 1
-                    even = not even
-            case "Layout3":                                     # horisontal (V)
-                for y in range(0, self.height, 1):              # top->bottom
-                    if not even:
-                        for x in range(0, self.width, 1):       # left->right
-                            self.pixel_grid[x + self.width*y].idx = idx
-                            idx += 1
-                    else:
-                        for x in range(self.width-1, -1, -1):   # right->left
-                            self.pixel_grid[x + self.width*y].idx = idx
-                            idx += 1
-                    even = not even
-            case "Layout4":                                     # horisontal (V)
-                for y in range(self.height-1, -1, -1):          # bottom->top
-                    if not even:
-                        for x in range(0, self.width, 1):       # left->right
-                            self.pixel_grid[x + self.width*y].idx = idx
-                            idx += 1
-                    else:
-                        for x in range(self.width-1, -1, -1):   # right->left
-                            self.pixel_grid[x + self.width*y].idx = idx
-                            idx += 1
-                    even = not even
-            case "Layout5":                                     # vertical (V)
-                for x in range(0, self.width, 1):               # left->right
-                    if even:
-                        for y in range(self.height-1, -1, -1):  # bottom->top
-                            self.pixel_grid[x + self.width*y].idx = idx
-                            idx += 1
-                    else:
-                        for y in range(self.height):            # top->bottom
-                            self.pixel_grid[x + self.width*y].idx = idx
-                            idx += 1
-                    even = not even
-            case "Layout6":                                     # vertical (V)
-                for x in range(0, self.width, 1):               # left->right
-                    if not even:
-                        for y in range(self.height-1, -1, -1):  # bottom->top
-                            self.pixel_grid[x + self.width*y].idx = idx
-                            idx += 1
-                    else:
-                        for y in range(self.height):            # top->bottom
-                            self.pixel_grid[x + self.width*y].idx = idx
-                            idx += 1
-                    even = not even
-            case "Layout7":                                     # vertical (V)
-                for x in range(self.width-1, -1, -1):           # right->left
-                    if not even:
-                        for y in range(self.height-1, -1, -1):  # bottom->top
-                            self.pixel_grid[x + self.width*y].idx = idx
-                            idx += 1
-                    else:
-                        for y in range(self.height):            # top->bottom
-                            self.pixel_grid[x + self.width*y].idx = idx
-                            idx += 1
-                    even = not even
-            case "Layout8":                                     # vertical (V)
-                for x in range(self.width-1, -1, -1):           # right->left
-                    if even:
-                        for y in range(self.height-1, -1, -1):  # bottom->top
-                            self.pixel_grid[x + self.width*y].idx = idx
-                            idx += 1
-                    else:
-                        for y in range(self.height):            # top->bottom
-                            self.pixel_grid[x + self.width*y].idx = idx
-                            idx += 1
-                    even = not even
-            case _:
-                pass
-
-    def __lt__(self, other):
-        return self.idx < other.idx
-
-
-class Pixel:
-    def __init__(self, parent, width:int, height:int, current_color:tuple, saved_color:list, row:int, col:int) -> None:
-        self.parent = parent
-        self.width = width
-        self.height = height
-        self.row = row
-        self.col = col
-        self.idx = 0 # idx of this pixel in the crate.color_grid, depends on layout
-        self.current_color = current_color
-        self.saved_color = saved_color
-        self.button = Button(self.parent, text="", command=self.save_color, bg="#000000", width=self.width, height=self.height, borderwidth=1, relief="solid", state="disabled")
-        self.button.grid(row=row, column=col, pady=2, padx=2)
-    
-    def save_color(self):
-        self.saved_color[self.idx] = self.current_color[0]
-        self.button.configure(bg=self.current_color[0][-1])
+                encoder = self.encoder()
+            except ValueError as e:
+                messagebox.showerror(message=str(e))
+                return
+            self.reconnect(0) # a second pace on top of the player's would skip and delay frames unseen by its metrics
+        log = open(f"{self.file_name()}_playback.log", "a")
+        self.player = Player(frames, self.sender.submit if self.sender is not None else None, fps, len(self.frame), encoder=encoder, repeat=repeat, log=log)
+        self.shown = bytearray(self.frame)
+        self.shown_index = -1
+        self.overlay = (self.canvas.create_rectangle(0, 0, 0, 0, fill="#000000", outline=""),
+                        self.canvas.create_text(4, 4, anchor="nw", fill="#ffffff", font="TkFixedFont", text="starting"))
+        self.play_button.configure(text="Stop")
+        self.player.start()
+        self.preview()
+
+    def preview(self) -> None:
+        # latest played frame on the canvas, at preview_fps on the mainloop, only LEDs that changed are redrawn
+        if self.player is None:
+            return
+        start = perf_counter()
+        self.shown_index, frame = self.player.latest(self.shown_index)
+        if frame is not None:
+            self.recolor(changed_cells(self.shown, frame, len(self.items)), frame)
+            self.shown[:] = frame
+            self.player.metrics.stage("preview", perf_counter() - start)
+        background, text = self.overlay
+        report = self.player.metrics.report()
+        if self.sender is not None:
+            report += f"\nsent {self.sender.sent}  dropped {self.sender.dropped}  late {self.sender.late}"
+            if self.sender.codec is not None:
+                report += f"  delta {self.sender.codec.stats.report()}"
+        self.canvas.itemconfigure(text, text=report)
+        self.canvas.coords(background, *self.canvas.bbox(text))
+        self.canvas.tag_raise(background)
+        self.canvas.tag_raise(text)
+        if not self.player.running():
+            self.stop_playback()
+            return
+        self.canvas.after(round(1000 / self.preview_fps), self.preview)
+
+    def stop_playback(self) -> None:
+        player, self.player = self.player, None
+        player.stop()
+        player.log.close()
+        self.canvas.delete(*self.overlay)
+        self.overlay = ()
+        # back to the painted colors
+        self.recolor(changed_cells(self.shown, self.frame, len(self.items)), self.frame)
+        self.shown = None
+        self.play_button.configure(text="Play")
+        if self.sender is not None:
+            self.reconnect(self.send_fps)
+        if player.error is not None:
+            messagebox.showerror(message=f"Playback stopped: {player.error}")
+
+    def close(self) -> None:
+        if self.importing is not None:
+            self.importing.cancel()
+        if self.sender is not None:
+            self.disconnect()
+        if self.player is not None:
+            self.stop_playback()
+        self.container.destroy()
 
 class App:
+    autosave_interval = 5000 # ms
+
     def __init__(self, display_name:str, width:int, height:int) -> None:
         self.root = tk.Tk()
         self.root.title(display_name)
@@ -310,6 +721,13 @@ class App:
         self.root.focus_force()
         self.walls = []
 
+        # autosave keeps the project file up to date, only crates that changed are rewritten
+        self.project_path = "./autosave.cratelight"
+        self.autosave = project.Autosave(self.project_path)
+        self.saved_walls = None # walls in the project file, any other structure needs a full rewrite
+        self.root.after(self.autosave_interval, self.save_changes)
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+
         # create main tab
         self.window_tabs = ttk.Notebook(self.root)
         self.window_tabs.pack(expand=True, fill="both")
@@ -317,6 +735,7 @@ class App:
         self.setup_main_page(self.main_tab_content)
         self.window_tabs.add(self.main_tab_container, text=f"Wall and Crate Settings")
 
+        self.restore_autosave()
         self.root.mainloop()
 
     def setup_main_page(self, parent: ttk.Frame) -> None:
@@ -332,7 +751,7 @@ class App:
         self.lbl_crate_height_valid = ttk.Label(frame_crate_info, text="Empty  ", foreground="orange")
         self.ent_crate_height = ttk.Entry(frame_crate_info, validatecommand=lambda: validate_positive_int(self.ent_crate_height.get(), self.lbl_crate_height_valid), validate="focusout")
 
-        self.arr_crate_layouts = ["Layout1", "Layout2", "Layout3", "Layout4", "Layout5", "Layout6", "Layout7", "Layout8"]
+        self.arr_crate_layouts = list(LAYOUTS)
         self.str_crate_layout = tk.StringVar(parent)
         self.str_crate_layout.set("Layout1")
         crate_layout_menu = tk.OptionMenu(frame_crate_info, self.str_crate_layout, *self.arr_crate_layouts)
@@ -386,16 +805,106 @@ class App:
 
         button = Button(parent, text="Create New Wall", command=self.add_wall, bg="#00cc00", **borderless_option)
         button.grid(row=4, column=0, columnspan=3)
-        
+
+        frame_project = ttk.Frame(parent)
+        Button(frame_project, text="Save Project", command=self.save_project, bg="white", **borderless_option).grid(row=0, column=0)
+        Button(frame_project, text="Load Project", command=self.load_project, bg="white", **borderless_option).grid(row=0, column=1)
+        frame_project.grid(row=5, column=0, columnspan=3, pady=10)
+
+    def create_wall(self, name:str, width:int, height:int, crate_width:int, crate_height:int, crate_layout:str) -> Wall:
+        container, content = get_scrollable_frame(self.window_tabs, 1000, 1000)
+        wall = Wall(name, container, content, width, height, crate_width, crate_height, crate_layout)
+        self.walls.append(wall)
+        self.window_tabs.add(wall.container, text=wall.name)
+        self.window_tabs.select(wall.container)
+        return wall
+
     def add_wall(self) -> None:
         self.root.focus()
         if not self.lbl_wall_height_valid.cget("text") == self.lbl_wall_width_valid.cget("text") == self.lbl_crate_height_valid.cget("text") == self.lbl_wall_width_valid.cget("text") == "Valid  ":
             messagebox.showinfo(message="All Crate and Wall values must be valid")
         else:
-            wall_name = f"Wall {len(self.walls)}"
-            container, content = get_scrollable_frame(self.window_tabs, 1000, 1000)
-            self.walls.append(Wall(wall_name, container, content, int(self.ent_wall_width.get()), int(self.ent_wall_height.get()), int(self.ent_crate_width.get()), int(self.ent_crate_height.get()), self.str_crate_layout.get()))
-            self.window_tabs.add(self.walls[-1].container, text=self.walls[-1].name)
+            self.create_wall(f"Wall {len(self.walls)}", int(self.ent_wall_width.get()), int(self.ent_wall_height.get()), int(self.ent_crate_width.get()), int(self.ent_crate_height.get()), self.str_crate_layout.get())
+
+    def save_changes(self) -> None:
+        self.root.after(self.autosave_interval, self.save_changes)
+        self.write_changes()
+
+    def write_changes(self) -> None:
+        if not self.walls:
+            return
+        # snapshots are taken here on the Tk thread, the autosave thread only writes them
+        if self.saved_walls != len(self.walls):
+            self.autosave.write_all(project.pack(self.walls))
+            self.saved_walls = len(self.walls)
+        else:
+            dirty = {index: {crate.col * wall.height + crate.row for crate in wall.dirty} for index, wall in enumerate(self.walls) if wall.dirty or wall.header_dirty}
+            if dirty:
+                self.autosave.write_patches(project.patches(self.walls, dirty))
+        for wall in self.walls:
+            wall.dirty.clear()
+            wall.header_dirty = False
+
+    def save_project(self) -> None:
+        path = filedialog.asksaveasfilename(title="Save Project", defaultextension=".cratelight", filetypes=[("CrateLight project", "*.cratelight")])
+        if not path:
+            return
+        self.set_project_path(path)
+        self.write_changes()
+
+    def restore_autosave(self) -> None:
+        # a project left by an earlier session is loaded, or moved aside, before the first autosave would replace it
+        if not os.path.exists(self.project_path):
+            return
+        if messagebox.askyesno(message=f"Restore the project autosaved to {self.project_path}?") and self.open_project(self.project_path):
+            return
+        backup = self.project_path + ".bak"
+        try:
+            os.replace(self.project_path, backup)
+        except OSError as e:
+            messagebox.showwarning(message=f"Could not move {self.project_path} aside, it will be overwritten: {e}")
+            return
+        messagebox.showinfo(message=f"The autosaved project was moved to {backup}")
+
+    def load_project(self) -> None:
+        path = filedialog.askopenfilename(title="Load Project", filetypes=[("CrateLight project", "*.cratelight"), ("All files", "*")])
+        if path:
+            self.open_project(path)
+
+    def open_project(self, path:str) -> bool:
+        # changes of the open walls still go to their own project file, which may also be the one being opened
+        self.write_changes()
+        self.autosave.flush()
+        try:
+            snapshots = project.load(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror(message=f"Could not load {path}: {e}")
+            return False
+        for wall in self.walls:
+            wall.close()
+        self.walls = []
+        for snapshot in snapshots:
+            wall = self.create_wall(snapshot.name, snapshot.width, snapshot.height, snapshot.crate_width, snapshot.crate_height, snapshot.crate_layout)
+            wall.restore(snapshot)
+        self.set_project_path(path)
+        # the file already holds exactly this state, unless it is of an older version and has to be rewritten in full
+        self.saved_walls = len(self.walls) if all(snapshot.version == project.VERSION for snapshot in snapshots) else None
+        return True
+
+    def close(self) -> None:
+        self.write_changes()
+        self.autosave.close()
+        for wall in self.walls:
+            wall.close()
+        self.root.destroy()
+
+    def set_project_path(self, path:str) -> None:
+        self.autosave.close()
+        if self.autosave.error is not None:
+            messagebox.showwarning(message=f"Autosave to {self.project_path} failed: {self.autosave.error}")
+        self.project_path = path
+        self.autosave = project.Autosave(path)
+        self.saved_walls = None
 
 if __name__ == "__main__":
     app = App(display_name=" CrateLight GUI", width=450, height=430)
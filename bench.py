@@ -0,0 +1,260 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import effects
+from codec import DeltaEncoder
+from crate_file import CrateWriter, CODEC_DELTA
+from model import Wall
+from output_map import LAYOUTS
+
+# Benchmarks of the hot paths, over a grid of crate and wall sizes:
+#   python3 bench.py                                  everything, a table on stdout
+#   python3 bench.py --quick --json after.json        the smaller sizes only, results as JSON
+#   python3 bench.py --baseline before.json           compare against earlier results, exit status 1 on a regression
+# Every case reports the median time of a run, peak memory of a run and, for cases that produce frames, frames per second.
+# GUI cases need a display: an existing one, or a virtual one started with Xvfb when it is installed; otherwise they are skipped.
+
+CRATE_SIZES = ((6, 4), (8, 8), (16, 16))
+WALL_SIZES = ((4, 4), (16, 16), (32, 32))
+QUICK_WALL_SIZES = ((4, 4), (16, 16))
+
+BENCHMARKS = {}
+
+def benchmark(name:str, gui:bool=False):
+    # a benchmark takes the crate and wall size and returns (run, frames per run), run is timed without its setup
+    def register(function):
+        BENCHMARKS[name] = (function, gui)
+        return function
+    return register
+
+def indexed_wall(crate_size:tuple, wall_size:tuple, layout:str="Layout1") -> Wall:
+    wall = Wall("Bench", *wall_size, *crate_size, layout)
+    for index, crate in enumerate(wall.crates):
+        crate.idx = index
+    return wall
+
+@benchmark("wall")
+def bench_wall(crate_size:tuple, wall_size:tuple):
+    return lambda: Wall("Bench", *wall_size, *crate_size, "Layout1"), 0
+
+@benchmark("layouts")
+def bench_layouts(crate_size:tuple, wall_size:tuple):
+    # every crate changed to each of the layouts in turn, and the output map compiled for it
+    wall = indexed_wall(crate_size, wall_size)
+    def run():
+        for layout in LAYOUTS:
+            for crate in wall.crates:
+                crate.change_layout(layout)
+            wall.output_map()
+    return run, 0
+
+@benchmark("encode")
+def bench_encode(crate_size:tuple, wall_size:tuple):
+    wall = indexed_wall(crate_size, wall_size)
+    encoder = wall.encoder()
+    frames = [bytearray(frame) for frame in effects.frames(effects.Plasma(wall.leds_wide, wall.leds_high), count=8)]
+    def run():
+        for frame in frames:
+            encoder.encode(frame)
+    return run, len(frames)
+
+@benchmark("save")
+def bench_save(crate_size:tuple, wall_size:tuple):
+    wall = indexed_wall(crate_size, wall_size)
+    wall.frame[:] = next(effects.frames(effects.Plasma(wall.leds_wide, wall.leds_high), count=1))
+    path = f"{wall.file_name()}_bench.crate"
+    def run():
+        wall.save(path)
+        os.remove(path)
+    return run, 1
+
+@benchmark("crate_file")
+def bench_crate_file(crate_size:tuple, wall_size:tuple):
+    # encoding and delta coding of an animation into a multi-frame .crate
+    wall = indexed_wall(crate_size, wall_size)
+    encoder = wall.encoder()
+    frames = [bytes(encoder.encode(frame)) for frame in effects.frames(effects.Plasma(wall.leds_wide, wall.leds_high), count=30)]
+    path = f"{wall.file_name()}_bench.crate"
+    def run():
+        with CrateWriter(path, *wall_size, *crate_size, len(encoder), codec=CODEC_DELTA) as writer:
+            for frame in frames:
+                writer.write(frame)
+        os.remove(path)
+    return run, len(frames)
+
+@benchmark("codec")
+def bench_codec(crate_size:tuple, wall_size:tuple):
+    wall = indexed_wall(crate_size, wall_size)
+    encoder = wall.encoder()
+    frames = [bytes(encoder.encode(frame)) for frame in effects.frames(effects.Text(wall.leds_wide, wall.leds_high), count=30)]
+    def run():
+        codec = DeltaEncoder()
+        for frame in frames:
+            codec.encode(frame)
+    return run, len(frames)
+
+@benchmark("effects")
+def bench_effects(crate_size:tuple, wall_size:tuple):
+    wall = indexed_wall(crate_size, wall_size)
+    def run():
+        for _ in effects.frames(effects.Plasma(wall.leds_wide, wall.leds_high), count=30):
+            pass
+    return run, 30
+
+@benchmark("send")
+def bench_send(crate_size:tuple, wall_size:tuple):
+    # frames through FrameSender to a local UDP socket, unpaced, each frame waits until it is out
+    from sender import FrameSender
+    wall = indexed_wall(crate_size, wall_size)
+    frame = bytes(wall.encoder().encode(wall.frame))
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    sender = FrameSender("127.0.0.1", receiver.getsockname()[1], fps=0)
+    sender.start()
+    def run():
+        for _ in range(30):
+            sent = sender.sent
+            sender.submit(frame)
+            while sender.sent == sent and sender.running():
+                time.sleep(0)
+    def close():
+        sender.stop()
+        receiver.close()
+    run.close = close
+    return run, 30
+
+@benchmark("gui_wall", gui=True)
+def bench_gui_wall(crate_size:tuple, wall_size:tuple):
+    # construction of a Wall tab until every crate is on the canvas
+    import tkinter as tk
+    import app
+    root = tk.Tk()
+    root.withdraw()
+    def run():
+        container, content = app.get_scrollable_frame(root, 1000, 1000)
+        wall = app.Wall("Bench", container, content, *wall_size, *crate_size, "Layout1")
+        while not wall.crates[-1].drawn:
+            root.update()
+        wall.close()
+    run.close = root.destroy
+    return run, 0
+
+def measure(function, crate_size:tuple, wall_size:tuple, repeat:int, budget:float) -> dict:
+    run, frames = function(crate_size, wall_size)
+    try:
+        run() # warm up caches, imports and lazily compiled state
+        times = []
+        started = time.perf_counter()
+        while len(times) < repeat and (not times or time.perf_counter() - started < budget):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+        tracemalloc.start()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        if hasattr(run, "close"):
+            run.close()
+    seconds = statistics.median(times)
+    return {"seconds": seconds, "best": min(times), "runs": len(times), "peak_bytes": peak, "fps": frames / seconds if frames else None}
+
+def start_display():
+    # returns the Xvfb process, if one had to be started, or False if there is no display at all
+    if os.environ.get("DISPLAY") or sys.platform in ("win32", "darwin"):
+        return None
+    if shutil.which("Xvfb") is None:
+        return False
+    display = f":{90 + os.getpid() % 100}"
+    xvfb = subprocess.Popen(["Xvfb", display, "-screen", "0", "1920x1080x24", "-nolisten", "tcp"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(0.5)
+    if xvfb.poll() is not None:
+        return False
+    os.environ["DISPLAY"] = display
+    return xvfb
+
+def key(result:dict) -> str:
+    return f"{result['name']} crate={result['crate']} wall={result['wall']}"
+
+def compare(results:list[dict], baseline:list[dict], tolerance:float) -> list[str]:
+    # cases at least tolerance slower than in the baseline, by the best run, which is the least affected by other load
+    before = {key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        old = before.get(key(result))
+        if old is None or "best" not in old or "best" not in result:
+            continue
+        ratio = result["best"] / old["best"]
+        result["baseline_ratio"] = ratio
+        if ratio > 1 + tolerance:
+            regressions.append(f"{key(result)}: {1000 * old['best']:.3f} ms -> {1000 * result['best']:.3f} ms ({ratio:.2f}x)")
+    return regressions
+
+def report(result:dict) -> str:
+    if "skipped" in result:
+        return f"{key(result):<44} skipped: {result['skipped']}"
+    fps = f"{result['fps']:10.0f} fps" if result["fps"] else " " * 14
+    ratio = f"  {result['baseline_ratio']:.2f}x baseline" if "baseline_ratio" in result else ""
+    return f"{key(result):<44} {1000 * result['seconds']:10.3f} ms {fps} {result['peak_bytes'] / 1024:10.0f} KiB{ratio}"
+
+def main(argv:list[str]|None=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark wall construction, layout mapping, encoding and output throughput")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run, all by default: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--quick", action="store_true", help=f"walls up to {QUICK_WALL_SIZES[-1][0]}x{QUICK_WALL_SIZES[-1][1]} crates only")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case, fewer when a case takes longer than --budget")
+    parser.add_argument("--budget", type=float, default=2.0, help="seconds of timed runs per case")
+    parser.add_argument("--json", metavar="PATH", help="write the results to a JSON file")
+    parser.add_argument("--baseline", metavar="PATH", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="slowdown against the baseline reported as a regression")
+    args = parser.parse_args(argv)
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks {', '.join(sorted(unknown))}")
+    names = args.names or list(BENCHMARKS)
+
+    display = None
+    if any(BENCHMARKS[name][1] for name in names):
+        display = start_display()
+    results = []
+    try:
+        for name in names:
+            function, gui = BENCHMARKS[name]
+            for wall_size in QUICK_WALL_SIZES if args.quick else WALL_SIZES:
+                for crate_size in CRATE_SIZES:
+                    result = {"name": name, "crate": "x".join(map(str, crate_size)), "wall": "x".join(map(str, wall_size))}
+                    if gui and display is False:
+                        result["skipped"] = "no display and no Xvfb"
+                    else:
+                        result.update(measure(function, crate_size, wall_size, args.repeat, args.budget))
+                    results.append(result)
+                    if args.baseline is None:
+                        print(report(result), flush=True)
+    finally:
+        if display:
+            display.terminate()
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+        for result in results:
+            print(report(result))
+    if args.json:
+        environment = {"python": platform.python_version(), "platform": platform.platform(), "processor": platform.processor(), "numpy": effects.np is not None}
+        with open(args.json, "w") as f:
+            json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "environment": environment, "results": results}, f, indent=1)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import re
+import struct
+import time
+
+# Delta and run-length coding of LED streams (3 bytes per LED), used by .crate files and by the sender.
+# A packet is a PACKET header followed by ops, every op is a u32 with the kind in the top 2 bits and a count of LEDs in the rest:
+#   SKIP n      the next n LEDs are unchanged since the previous frame (delta frames only)
+#   FILL n rgb  the next n LEDs have the same color
+#   COPY n ...  the next n LEDs follow literally, 3n bytes
+# Keyframes describe every LED and can be decoded on their own, delta frames only describe LEDs that changed.
+PACKET = struct.Struct("<BI") # kind, number of LEDs
+OP = struct.Struct("<I")
+KEY, DELTA = 0, 1
+SKIP, FILL, COPY = 0, 1, 2
+COUNT_MASK = (1 << 30) - 1
+
+RUN = re.compile(rb"\x00{2,}")                            # 3 or more equal LEDs in a row, shorter runs are cheaper to copy
+CHANGED = re.compile(rb"[^\x00]+(?:\x00{1,2}[^\x00]+)*")  # changed LEDs, gaps shorter than a SKIP op are merged
+DIFFERENT = re.compile(rb"[^\x00]+")
+
+def _mask(a:bytes, b:bytes, count:int) -> bytes:
+    # one byte per LED, zero where a and b hold the same color
+    x = (int.from_bytes(a, "little") ^ int.from_bytes(b, "little")).to_bytes(3 * count, "little")
+    return (int.from_bytes(x[0::3], "little") | int.from_bytes(x[1::3], "little") | int.from_bytes(x[2::3], "little")).to_bytes(count, "little")
+
+def changed_cells(a, b, count:int) -> list[int]:
+    # LEDs whose colors differ between the first count LEDs of two frames
+    mask = _mask(bytes(a[:3 * count]), bytes(b[:3 * count]), count)
+    return [cell for span in DIFFERENT.finditer(mask) for cell in range(span.start(), span.end())]
+
+class CodecStats:
+    def __init__(self) -> None:
+        self.frames = 0
+        self.raw_bytes = 0
+        self.encoded_bytes = 0
+        self.seconds = 0.0
+
+    def add(self, raw:int, encoded:int, seconds:float) -> None:
+        self.frames += 1
+        self.raw_bytes += raw
+        self.encoded_bytes += encoded
+        self.seconds += seconds
+
+    def ratio(self) -> float:
+        return self.raw_bytes / self.encoded_bytes if self.encoded_bytes else 0.0
+
+    def report(self) -> str:
+        fps = self.frames / self.seconds if self.seconds else 0.0
+        return f"{self.frames} frames, ratio {self.ratio():.2f}, {fps:.0f} fps, {self.raw_bytes / self.seconds / 1e6 if self.seconds else 0.0:.1f} MB/s"
+
+class DeltaEncoder:
+    def __init__(self, key_interval:int=30) -> None:
+        self.key_interval = key_interval # a keyframe every this many frames bounds seeking and recovery from lost packets
+        self.previous = None
+        self.since_key = 0
+        self.stats = CodecStats()
+
+    def force_key(self) -> None:
+        self.previous = None
+
+    def encode(self, frame) -> bytes:
+        start = time.perf_counter()
+        frame = bytes(frame)
+        count = len(frame) // 3
+        out = bytearray()
+        same = _mask(frame[3:], frame[:-3], count - 1) if count > 1 else b""
+        if self.previous is None or len(self.previous) != len(frame) or self.since_key + 1 >= self.key_interval:
+            out += PACKET.pack(KEY, count)
+            self._emit(out, frame, same, 0, count)
+            self.since_key = 0
+        else:
+            out += PACKET.pack(DELTA, count)
+            position = 0
+            for span in CHANGED.finditer(_mask(self.previous, frame, count)):
+                if span.start() > position:
+                    out += OP.pack(SKIP << 30 | span.start() - position)
+                self._emit(out, frame, same, span.start(), span.end())
+                position = span.end()
+            self.since_key += 1
+        self.previous = frame
+        self.stats.add(len(frame), len(out), time.perf_counter() - start)
+        return bytes(out)
+
+    def _emit(self, out:bytearray, frame:bytes, same:bytes, start:int, stop:int) -> None:
+        position = start
+        for run in RUN.finditer(same, start, stop - 1):
+            # zeros at run.start()..run.end()-1 mean LEDs run.start()..run.end() share a color
+            if run.start() > position:
+                out += OP.pack(COPY << 30 | run.start() - position)
+                out += frame[3 * position:3 * run.start()]
+            out += OP.pack(FILL << 30 | run.end() + 1 - run.start())
+            out += frame[3 * run.start():3 * run.start() + 3]
+            position = run.end() + 1
+        if stop > position:
+            out += OP.pack(COPY << 30 | stop - position)
+            out += frame[3 * position:3 * stop]
+
+def is_key(packet) -> bool:
+    return packet[0] == KEY
+
+class DeltaDecoder:
+    def __init__(self) -> None:
+        self.frame = None # last decoded frame, updated in place
+        self.stats = CodecStats()
+
+    def decode(self, packet) -> bytearray:
+        start = time.perf_counter()
+        kind, count = PACKET.unpack_from(packet)
+        if kind == KEY:
+            if self.frame is None or len(self.frame) != 3 * count:
+                self.frame = bytearray(3 * count)
+        elif self.frame is None or len(self.frame) != 3 * count:
+            raise ValueError("Delta frame without a preceding keyframe")
+        frame = self.frame
+        i = PACKET.size
+        end = len(packet)
+        position = 0
+        while i < end:
+            op = OP.unpack_from(packet, i)[0]
+            i += 4
+            n = 3 * (op & COUNT_MASK)
+            kind = op >> 30
+            if kind == FILL:
+                frame[position:position + n] = bytes(packet[i:i + 3]) * (n // 3)
+                i += 3
+            elif kind == COPY:
+                frame[position:position + n] = packet[i:i + n]
+                i += n
+            position += n
+        self.stats.add(len(frame), end, time.perf_counter() - start)
+        return frame
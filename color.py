@@ -0,0 +1,46 @@
+# Output stage color correction, applied to encoded LED streams with 256 entry lookup tables (bytes.translate),
+# so a whole frame is corrected in one or three passes in C instead of LED by LED.
+
+CHANNEL_ORDERS = ("RGB", "RBG", "GRB", "GBR", "BRG", "BGR")
+
+def table(gamma:float=1.0, gain:float=1.0) -> bytes:
+    return bytes(min(255, round(255 * (value / 255) ** gamma * gain)) for value in range(256))
+
+def output_pipeline(gamma:float, brightness:float, max_amps:float) -> "ColorPipeline|None":
+    # None for settings that leave the colors as they are, so the encoder skips the pipeline altogether
+    if gamma == 1 and brightness == 1 and not max_amps:
+        return None
+    return ColorPipeline(gamma=gamma, brightness=brightness, max_amps=max_amps)
+
+class ColorPipeline:
+    def __init__(self, gamma:float=2.2, brightness:float=1.0, gains:tuple=(1.0, 1.0, 1.0), max_amps:float=0.0, milliamps_per_channel:float=20.0, idle_milliamps:float=1.0) -> None:
+        self.gamma = gamma
+        self.brightness = brightness                        # 0..1, global
+        self.gains = gains                                  # per channel white balance, in RGB order
+        self.max_amps = max_amps                            # budget of the power supply, 0 disables limiting
+        self.milliamps_per_channel = milliamps_per_channel  # drawn by a single channel at full duty
+        self.idle_milliamps = idle_milliamps                # drawn by every LED even when it is black
+        self.tables = tuple(table(gamma, brightness * gain) for gain in gains) # in RGB order
+        self.amps = 0.0                                     # estimate for the last frame, after limiting
+        self.limited = 0                                    # frames scaled down to stay within max_amps
+
+    def estimate(self, stream) -> float:
+        # current drawn by a stream of already corrected values, duty cycle is proportional to the value
+        return (sum(stream) * self.milliamps_per_channel / 255 + len(stream) // 3 * self.idle_milliamps) / 1000
+
+    def apply(self, stream:bytearray, channel_order:str="RGB") -> float:
+        # corrects the stream in place, channel_order is the order of the channels in the stream
+        tables = [self.tables["RGB".index(channel)] for channel in channel_order]
+        if tables[0] == tables[1] == tables[2]:
+            stream[:] = stream.translate(tables[0])
+        else:
+            for channel in range(3):
+                stream[channel::3] = stream[channel::3].translate(tables[channel])
+        self.amps = self.estimate(stream)
+        if self.max_amps and self.amps > self.max_amps:
+            idle = len(stream) // 3 * self.idle_milliamps / 1000
+            scale = max(0.0, (self.max_amps - idle) / (self.amps - idle))
+            stream[:] = stream.translate(bytes(int(value * scale) for value in range(256)))
+            self.amps = self.estimate(stream)
+            self.limited += 1
+        return self.amps
@@ -0,0 +1,177 @@
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+
+from codec import DeltaEncoder, DeltaDecoder, is_key
+
+# Multi-frame .crate container, little endian:
+#   header      see HEADER below, frame_count and index_offset are filled in when the writer is closed
+#   frames      LED streams, one after another, each exactly as a single-frame .crate file would hold it,
+#               or packets of codec.py when the codec is CODEC_DELTA
+#   index       frame_count u64 offsets followed by frame_count u32 lengths
+# Files without the magic are the original headerless single-frame format.
+MAGIC = b"CRTL"
+VERSION = 1
+HEADER = struct.Struct("<4sHHHHHHIfIQHH") # magic, version, header size, width, height, crate width, crate height, frame size, fps, frame count, index offset, codec, reserved
+CODEC_RAW = 0
+CODEC_DELTA = 1
+
+LEGACY_NAME = re.compile(r"_w(\d+)_h(\d+)_cw(\d+)_ch(\d+)\.crate$")
+
+def _le_array(typecode:str, data) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+class CrateWriter:
+    def __init__(self, path:str, width:int, height:int, crate_width:int, crate_height:int, frame_size:int, fps:float=30.0, codec:int=CODEC_RAW) -> None:
+        self.path = path
+        self.width = width
+        self.height = height
+        self.crate_width = crate_width
+        self.crate_height = crate_height
+        self.frame_size = frame_size
+        self.fps = fps
+        self.codec = codec
+        self.encoder = DeltaEncoder(key_interval=max(1, round(fps))) if codec == CODEC_DELTA else None # a keyframe every second
+        self.offsets = array("Q")
+        self.lengths = array("I")
+        self.file = open(path, "wb")
+        self.file.write(self._header(0, 0)) # placeholder, rewritten by close()
+        self.position = HEADER.size
+
+    def _header(self, frame_count:int, index_offset:int) -> bytes:
+        return HEADER.pack(MAGIC, VERSION, HEADER.size, self.width, self.height, self.crate_width, self.crate_height, self.frame_size, self.fps, frame_count, index_offset, self.codec, 0)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def write(self, frame) -> None:
+        # frame is any bytes-like object, eg the memoryview returned by FrameEncoder.encode
+        if self.encoder is not None:
+            frame = self.encoder.encode(frame)
+        length = self.file.write(frame)
+        self.offsets.append(self.position)
+        self.lengths.append(length)
+        self.position += length
+
+    def close(self) -> None:
+        if self.file.closed:
+            return
+        offsets, lengths = array("Q", self.offsets), array("I", self.lengths)
+        if sys.byteorder != "little":
+            offsets.byteswap()
+            lengths.byteswap()
+        self.file.write(offsets.tobytes())
+        self.file.write(lengths.tobytes())
+        self.file.seek(0)
+        self.file.write(self._header(len(self.offsets), self.position))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+class CrateReader:
+    def __init__(self, path:str) -> None:
+        self.path = path
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self._mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._view = memoryview(self._mmap) if size else memoryview(b"")
+        self.codec = CODEC_RAW
+        self.decoder = None
+        self._decoded = -1 # index of the frame held by the decoder
+        if size >= HEADER.size and self._view[:4] == MAGIC:
+            self._read_header(size)
+        else:
+            self._read_legacy(size)
+
+    def _read_header(self, size:int) -> None:
+        magic, self.version, header_size, self.width, self.height, self.crate_width, self.crate_height, self.frame_size, self.fps, frame_count, index_offset, self.codec, _ = HEADER.unpack_from(self._view)
+        if self.version > VERSION:
+            raise ValueError(f"{self.path}: unsupported .crate version {self.version}")
+        if self.codec not in (CODEC_RAW, CODEC_DELTA):
+            raise ValueError(f"{self.path}: unsupported .crate codec {self.codec}")
+        if self.codec == CODEC_DELTA:
+            self.decoder = DeltaDecoder()
+        if index_offset:
+            self.offsets = _le_array("Q", self._view[index_offset:index_offset + 8 * frame_count])
+            self.lengths = _le_array("I", self._view[index_offset + 8 * frame_count:index_offset + 12 * frame_count])
+        else:
+            # the writer was not closed, recover every complete raw frame
+            if self.codec != CODEC_RAW or not self.frame_size:
+                raise ValueError(f"{self.path}: .crate file was not closed properly")
+            frame_count = (size - header_size) // self.frame_size
+            self.offsets = array("Q", range(header_size, header_size + frame_count * self.frame_size, self.frame_size))
+            self.lengths = array("I", [self.frame_size]) * frame_count
+
+    def _read_legacy(self, size:int) -> None:
+        # single headerless frame, dimensions are only known from the file name
+        self.version = 0
+        self.fps = 0.0
+        self.frame_size = size
+        match = LEGACY_NAME.search(os.path.basename(self.path))
+        self.width, self.height, self.crate_width, self.crate_height = map(int, match.groups()) if match else (0, 0, 0, 0)
+        self.offsets = array("Q", [0])
+        self.lengths = array("I", [size])
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, index:int) -> memoryview:
+        # zero-copy slice of the mapped file as stored, valid until the reader is closed
+        offset = self.offsets[index]
+        return self._view[offset:offset + self.lengths[index]]
+
+    def frame(self, index:int):
+        # LED stream of the frame, decoded if the file is compressed; a decoded frame is only valid until the next call
+        if self.decoder is None:
+            return self[index]
+        index = range(len(self.offsets))[index]
+        if index != self._decoded:
+            start = index
+            if index != self._decoded + 1:
+                # random access, decode from the closest preceding keyframe
+                while start > 0 and not is_key(self[start]):
+                    start -= 1
+            for i in range(start, index + 1):
+                self.decoder.decode(self[i])
+            self._decoded = index
+        return self.decoder.frame
+
+    def frames(self):
+        for index in range(len(self.offsets)):
+            yield self.frame(index)
+
+    def __iter__(self):
+        for index in range(len(self.offsets)):
+            yield self[index]
+
+    def seek_time(self, seconds:float) -> int:
+        # index of the frame shown at the given time of the show
+        if not self.fps:
+            return 0
+        return min(max(int(seconds * self.fps), 0), len(self.offsets) - 1)
+
+    def close(self) -> None:
+        self._view.release()
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass # frames are still referenced, the mapping is released with the last of them
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
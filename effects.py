@@ -0,0 +1,194 @@
+import inspect
+import math
+import random
+from abc import ABC, abstractmethod
+from typing import Iterator
+
+from encoder import new_frame
+
+try:
+    import numpy as np
+except ImportError:
+    np = None # every effect also works without NumPy, on whole frames as bytes
+
+# Procedural content for a grid of LEDs (a Wall, or the canvas of a Session). Every effect computes a field of one
+# byte per LED for a moment in time; fields are colored through the effect's palette with bytes.translate, one pass
+# per channel. Fields are built from whole rows and frames at once: big integer lanes and byte slicing without NumPy,
+# array arithmetic with it. Both give the same frames.
+
+EFFECTS = {}
+
+def register(cls):
+    # makes an Effect subclass available by its name, eg to `render.py --effect`
+    if inspect.isabstract(cls):
+        raise TypeError(f"Effect {cls.__name__} does not implement {', '.join(sorted(cls.__abstractmethods__))}")
+    EFFECTS[cls.name] = cls
+    return cls
+
+def ramp(a:tuple, b:tuple) -> tuple[bytes, bytes, bytes]:
+    # palette from color a at 0 to color b at 255
+    return tuple(bytes(a[channel] + (b[channel] - a[channel]) * value // 255 for value in range(256)) for channel in range(3))
+
+def rainbow() -> tuple[bytes, bytes, bytes]:
+    # full hue circle, so fields that wrap around at 256 do not show a seam
+    return tuple(bytes(round(127.5 + 127.5 * math.cos(2 * math.pi * (value / 256 - channel / 3))) for value in range(256)) for channel in range(3))
+
+SINE = bytes(round(127.5 + 127.5 * math.sin(2 * math.pi * value / 256)) for value in range(256))
+
+def add(count:int, *fields:bytes) -> bytes:
+    # sum of fields modulo 256, every byte summed in its own 16 bit lane of a big integer
+    total = 0
+    for field in fields:
+        wide = bytearray(2 * count)
+        wide[0::2] = field
+        total += int.from_bytes(wide, "little")
+    return total.to_bytes(2 * count + 1, "little")[0:2 * count:2]
+
+class Effect(ABC):
+    name = ""
+
+    def __init__(self, width:int, height:int, speed:float=0.25) -> None:
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.speed = speed       # cycles per second
+        self.palette = rainbow() # r, g and b tables indexed by the field
+
+    def phase(self, t:float, scale:float=1.0) -> int:
+        return int(256 * self.speed * scale * t) & 255
+
+    @abstractmethod
+    def field(self, t:float) -> bytes:
+        # one byte per LED, row by row, at t seconds
+        ...
+
+    field_numpy = None # optional, the same field as a uint8 array, used when NumPy is installed
+
+    def colorize(self, field, frame:bytearray) -> None:
+        end = 3 * self.size
+        for channel in range(3):
+            frame[channel:end:3] = field.translate(self.palette[channel])
+
+@register
+class Gradient(Effect):
+    name = "gradient"
+
+    def __init__(self, width:int, height:int, speed:float=0.25, slope_x:int=4, slope_y:int=2) -> None:
+        super().__init__(width, height, speed)
+        self.columns = [x * slope_x & 255 for x in range(width)]
+        self.rows = b"".join(bytes([y * slope_y & 255]) * width for y in range(height))
+
+    def field(self, t:float) -> bytes:
+        phase = self.phase(t)
+        return add(self.size, bytes((column + phase) & 255 for column in self.columns) * self.height, self.rows)
+
+    def field_numpy(self, t:float):
+        columns = np.array(self.columns, dtype=np.uint16)
+        rows = np.frombuffer(self.rows, dtype=np.uint8).reshape(self.height, self.width)
+        return ((columns[None, :] + self.phase(t) + rows) & 255).astype(np.uint8)
+
+@register
+class Plasma(Effect):
+    name = "plasma"
+
+    def __init__(self, width:int, height:int, speed:float=0.25, scale:int=8) -> None:
+        super().__init__(width, height, speed)
+        self.scale = scale # sine periods are 256 / scale LEDs long
+
+    def _terms(self, t:float) -> tuple[list[int], list[int], list[int]]:
+        # a horizontal, a vertical and a diagonal wave, each with its own speed
+        a, b, c = self.phase(t), self.phase(t, 0.7), self.phase(t, 1.3)
+        columns = [SINE[(x * self.scale + a) & 255] for x in range(self.width)]
+        rows = [SINE[(y * self.scale + b) & 255] for y in range(self.height)]
+        diagonal = [SINE[(d * self.scale // 2 + c) & 255] for d in range(self.width + self.height)]
+        return columns, rows, diagonal
+
+    def field(self, t:float) -> bytes:
+        columns, rows, diagonal = self._terms(t)
+        diagonal = bytes(diagonal)
+        return add(self.size, bytes(columns) * self.height, b"".join(bytes([row]) * self.width for row in rows),
+                   b"".join(diagonal[y:y + self.width] for y in range(self.height)))
+
+    def field_numpy(self, t:float):
+        columns, rows, diagonal = (np.array(term, dtype=np.uint16) for term in self._terms(t))
+        y, x = np.indices((self.height, self.width))
+        return ((columns[None, :] + rows[:, None] + diagonal[x + y]) & 255).astype(np.uint8)
+
+@register
+class Noise(Effect):
+    name = "noise"
+
+    def __init__(self, width:int, height:int, speed:float=0.25, color:tuple=(255, 255, 255), seed:int|None=None) -> None:
+        super().__init__(width, height, speed)
+        self.palette = ramp((0, 0, 0), color)
+        self.random = random.Random(seed)
+
+    def field(self, t:float) -> bytes:
+        return self.random.randbytes(self.size) # new noise every frame, t is ignored
+
+@register
+class Fade(Effect):
+    name = "fade"
+
+    def __init__(self, width:int, height:int, speed:float=0.25, color:tuple=(255, 0, 0), to:tuple=(0, 0, 255)) -> None:
+        super().__init__(width, height, speed)
+        self.palette = ramp(color, to)
+
+    def field(self, t:float) -> bytes:
+        # there and back once per cycle
+        phase = self.phase(t)
+        return bytes([2 * phase if phase < 128 else 511 - 2 * phase]) * self.size
+
+# 3x5 glyphs, rows top to bottom, 3 bits per row with the left column in the highest bit
+FONT = {
+    " ": "000000000000000", "!": "010010010000010", ".": "000000000000010", "-": "000000111000000", ":": "000010000010000",
+    "0": "111101101101111", "1": "010110010010111", "2": "111001111100111", "3": "111001111001111", "4": "101101111001001",
+    "5": "111100111001111", "6": "111100111101111", "7": "111001001001001", "8": "111101111101111", "9": "111101111001111",
+    "A": "010101111101101", "B": "110101110101110", "C": "011100100100011", "D": "110101101101110", "E": "111100110100111",
+    "F": "111100110100100", "G": "011100101101011", "H": "101101111101101", "I": "111010010010111", "J": "001001001101010",
+    "K": "101101110101101", "L": "100100100100111", "M": "101111111101101", "N": "110101101101101", "O": "010101101101010",
+    "P": "110101110100100", "Q": "010101101110011", "R": "110101110101101", "S": "011100010001110", "T": "111010010010010",
+    "U": "101101101101111", "V": "101101101101010", "W": "101101111111101", "X": "101101010101101", "Y": "101101010010010",
+    "Z": "111001010100111",
+}
+
+@register
+class Text(Effect):
+    name = "text"
+
+    def __init__(self, width:int, height:int, speed:float=0.25, text:str="CRATELIGHT", color:tuple=(255, 255, 255), background:tuple=(0, 0, 0)) -> None:
+        super().__init__(width, height, speed)
+        self.palette = ramp(background, color)
+        self.pixel = max(1, height // 6) # LEDs per font pixel, the text fills the height of the grid
+        glyphs = [FONT.get(char, FONT[" "]) for char in text.upper()]
+        self.length = len(glyphs) * 4 * self.pixel + width # a blank screen between repetitions
+        lines = [b"".join(b"".join(b"\xff" * self.pixel if bit == "1" else b"\0" * self.pixel for bit in glyph[3 * y:3 * y + 3]) + b"\0" * self.pixel for glyph in glyphs) for y in range(5)]
+        top = (height - 5 * self.pixel) // 2
+        blank = bytes(2 * self.length)
+        # every row twice, so any window of the scrolling text is a single slice
+        self.rows = [lines[(y - top) // self.pixel].ljust(self.length, b"\0") * 2 if 0 <= y - top < 5 * self.pixel else blank for y in range(height)]
+
+    def field(self, t:float) -> bytes:
+        # speed is in text lengths per second
+        offset = int(self.speed * self.length * t) % self.length
+        return b"".join(row[offset:offset + self.width] for row in self.rows)
+
+def create(name:str, width:int, height:int, **params) -> Effect:
+    try:
+        cls = EFFECTS[name]
+    except KeyError:
+        raise ValueError(f"Unknown effect {name}, one of {', '.join(EFFECTS)}")
+    return cls(width, height, **params)
+
+def frames(effect:Effect, fps:float=30.0, count:int|None=None, numpy:bool=True) -> Iterator[bytearray]:
+    # lazily, in the layout of encoder.new_frame, so FrameEncoder and Session take them as they are;
+    # the same buffer is yielded every time, it is only valid until the next frame is taken
+    frame = new_frame(effect.size)
+    vectorized = numpy and np is not None and effect.field_numpy is not None
+    index = 0
+    while count is None or index < count:
+        t = index / fps
+        field = effect.field_numpy(t).tobytes() if vectorized else effect.field(t)
+        effect.colorize(field, frame)
+        yield frame
+        index += 1
@@ -0,0 +1,45 @@
+from operator import itemgetter
+
+from output_map import OutputMap
+from color import ColorPipeline, CHANNEL_ORDERS
+
+def new_frame(size:int) -> bytearray:
+    # rgb of every wall cell, plus one cell that is always black and is sent for the extra pixels
+    return bytearray(3 * (size + 1))
+
+class FrameEncoder:
+    def __init__(self, output_map:OutputMap, channel_order:str="RGB", pipeline:ColorPipeline|None=None) -> None:
+        if channel_order not in CHANNEL_ORDERS:
+            raise ValueError(f"Unknown channel order {channel_order}, expected one of {', '.join(CHANNEL_ORDERS)}")
+        self.output_map = output_map
+        self.channel_order = channel_order           # order the LED strip expects the channels in, reordered for free by the gather
+        self.pipeline = pipeline                     # color correction applied to the encoded stream
+        self.buffer = bytearray(3 * len(output_map)) # preallocated once, reused by every frame
+        self.view = memoryview(self.buffer)
+        channels = ["RGB".index(channel) for channel in channel_order]
+        offsets = [3 * cell + channel for cell in output_map.cells for channel in channels]
+        self._getter = itemgetter(*offsets) if offsets else lambda frame: ()
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    def encode(self, frame:bytearray) -> memoryview:
+        # the returned view is only valid until the next call, copy it if it should be kept
+        self.buffer[:] = self._getter(frame)
+        if self.pipeline is not None:
+            self.pipeline.apply(self.buffer, self.channel_order)
+        return self.view
+
+    def encode_into(self, frame:bytearray, target, offset:int=0) -> int:
+        # write straight into a writable buffer, eg a bytearray, mmap or a socket send buffer
+        end = offset + len(self.buffer)
+        memoryview(target)[offset:end] = self.encode(frame)
+        return end
+
+    def write(self, frame:bytearray, stream) -> None:
+        # stream is a binary file or a connected socket
+        view = self.encode(frame)
+        if hasattr(stream, "sendall"):
+            stream.sendall(view)
+        else:
+            stream.write(view)
@@ -0,0 +1,134 @@
+import os
+import sys
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Iterable, Iterator
+
+# every source yields (rgb, width, height) tuples, rgb holds 3 bytes per pixel, row by row, top to bottom
+
+def _read_token(stream:BinaryIO) -> bytes:
+    token = b""
+    while True:
+        char = stream.read(1)
+        if not char:
+            return token
+        if char == b"#" and not token:
+            stream.readline() # comment
+        elif char.isspace():
+            if token:
+                return token
+        else:
+            token += char
+
+def read_ppm(stream:BinaryIO) -> Iterator[tuple[bytes, int, int]]:
+    # binary PPM (P6), several images may follow each other, eg `ffmpeg -i clip.mp4 -f image2pipe -vcodec ppm -`
+    while True:
+        magic = _read_token(stream)
+        if not magic:
+            return
+        if magic != b"P6":
+            raise ValueError(f"Unsupported PPM type {magic!r}")
+        width, height, maxval = int(_read_token(stream)), int(_read_token(stream)), int(_read_token(stream))
+        if maxval > 255:
+            raise ValueError("16 bit PPM images are not supported")
+        rgb = stream.read(3 * width * height)
+        if len(rgb) < 3 * width * height:
+            return
+        if maxval != 255:
+            rgb = rgb.translate(bytes(min(255, value * 255 // maxval) for value in range(256)))
+        yield rgb, width, height
+
+def read_raw(stream:BinaryIO, width:int, height:int) -> Iterator[tuple[bytes, int, int]]:
+    # headerless rgb24 frames, eg `ffmpeg -i clip.mp4 -f rawvideo -pix_fmt rgb24 -`
+    size = 3 * width * height
+    while True:
+        rgb = stream.read(size)
+        if len(rgb) < size:
+            return
+        yield rgb, width, height
+
+def read_photo(path:str, master=None) -> Iterator[tuple[bytes, int, int]]:
+    # PNG, GIF (every frame of an animation) and PPM through tk.PhotoImage, needs a running Tk
+    import tkinter as tk
+    animated = path.lower().endswith(".gif")
+    index = 0
+    while True:
+        try:
+            image = tk.PhotoImage(master=master, file=path, **({"format": f"gif -index {index}"} if animated else {}))
+        except tk.TclError:
+            if index == 0:
+                raise
+            return
+        rows = image.tk.splitlist(image.tk.call(image.name, "data"))
+        width, height = image.width(), image.height()
+        rgb = bytes.fromhex(" ".join(row if isinstance(row, str) else " ".join(row) for row in rows).replace("#", ""))
+        image.tk.call("image", "delete", image.name)
+        yield rgb, width, height
+        if not animated:
+            return
+        index += 1
+
+def open_source(path:str, master=None) -> Iterator[tuple[bytes, int, int]]:
+    if path.lower().endswith((".ppm", ".pnm")):
+        with open(path, "rb") as f:
+            yield from read_ppm(f)
+    else:
+        yield from read_photo(path, master)
+
+def _bounds(source:int, target:int) -> list[tuple[int, int]]:
+    # source range averaged into every target cell, at least one source pixel wide
+    bounds = []
+    for i in range(target):
+        start = i * source // target
+        bounds.append((start, max((i + 1) * source // target, start + 1)))
+    return bounds
+
+def downsample(rgb:bytes, width:int, height:int, target_width:int, target_height:int) -> bytes:
+    # area average of the source onto the target grid, the image is stretched to fill it
+    if (width, height) == (target_width, target_height):
+        return bytes(rgb)
+    rows = _bounds(height, target_height)
+    columns = [(3 * start, 3 * stop, stop - start) for start, stop in _bounds(width, target_width)]
+    # spread every channel value into its own little endian lane, wide enough to hold the sum of a column of a cell,
+    # so the source rows of a cell are summed as big integers instead of value by value
+    lane = 2 if max(stop - start for start, stop in rows) <= 257 else 4
+    wide = bytearray(lane * len(rgb))
+    wide[0::lane] = rgb
+    view = memoryview(wide)
+    stride = 3 * width * lane
+    sums = array("H" if lane == 2 else "I")
+    output = bytearray(3 * target_width * target_height)
+    out = 0
+    for start, stop in rows:
+        total = sum(int.from_bytes(view[y * stride:(y + 1) * stride], "little") for y in range(start, stop))
+        del sums[:]
+        sums.frombytes(total.to_bytes(stride, "little"))
+        if sys.byteorder != "little":
+            sums.byteswap()
+        for begin, end, count in columns:
+            area = count * (stop - start)
+            output[out] = sum(sums[begin:end:3]) // area
+            output[out + 1] = sum(sums[begin + 1:end:3]) // area
+            output[out + 2] = sum(sums[begin + 2:end:3]) // area
+            out += 3
+    return bytes(output)
+
+def _downsample(args:tuple) -> bytes:
+    return downsample(*args)
+
+def resample(frames:Iterable[tuple[bytes, int, int]], target_width:int, target_height:int, workers:int|None=None) -> Iterator[bytes]:
+    # downsample frames in a process pool, in order, with at most 2 frames per worker in flight to bound memory
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for rgb, width, height in frames:
+            yield downsample(rgb, width, height, target_width, target_height)
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        for rgb, width, height in frames:
+            pending.append(pool.submit(_downsample, (rgb, width, height, target_width, target_height)))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
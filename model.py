@@ -0,0 +1,145 @@
+from color import output_pipeline
+from encoder import FrameEncoder, new_frame
+from output_map import compile_output_map
+from tools import Journal
+
+# Wall and crates without any GUI: geometry, crate indices, layouts, colors of the LEDs and their encoding.
+# Importing this module never loads tkinter, so walls can be rendered on a headless Pi or a build server;
+# app.py extends both classes with the canvas and the dialogs.
+
+class Crate:
+    def __init__(self, wall:"Wall", width:int, height:int, layout:str, row:int, col:int, max_index:int, extra_pixel:bool=True) -> None:
+        self.wall = wall
+        self.width = width
+        self.height = height
+        self.layout = layout
+        self.row = row
+        self.col = col
+        self.idx = -1 # position in the chain of crates, -1 excludes the crate
+        self.extra_pixel = extra_pixel
+        self.max_index = max_index
+
+    def set_extra_pixel(self, extra_pixel:bool) -> None:
+        if extra_pixel != self.extra_pixel:
+            self.extra_pixel = extra_pixel
+            self.wall.invalidate_output_map()
+            self.wall.dirty.add(self)
+
+    def assign_index(self, idx:int) -> bool:
+        # False if nothing changed, duplicates are only detected when the output map is compiled
+        if not -1 <= idx <= self.max_index:
+            raise ValueError(f"Crate index {idx} is out of range -1..{self.max_index}")
+        if idx == self.idx:
+            return False
+        self.idx = idx
+        self.wall.invalidate_output_map()
+        self.wall.dirty.add(self)
+        return True
+
+    def change_layout(self, layout:str) -> None:
+        if layout == self.layout:
+            return
+        self.layout = layout
+        self.wall.invalidate_output_map()
+        self.wall.dirty.add(self)
+
+    def __lt__(self, other):
+        return self.idx < other.idx
+
+class Wall:
+    crate_class = Crate # app.py swaps in crates with dialogs
+
+    def __init__(self, name:str, width:int, height:int, crate_width:int, crate_height:int, crate_layout:str) -> None:
+        self.name = name
+        self.width = width
+        self.height = height
+        self.crate_height = crate_height
+        self.crate_width = crate_width
+        self.crate_layout = crate_layout
+        self.color = (128, 0, 128) # current painting color
+        self.channel_order = "RGB" # order of the channels expected by the LED strip
+        self.pipeline = None       # color correction of the output, raw colors are sent if None
+        self.frame = new_frame(self.leds_wide * self.leds_high) # rgb of every LED, indexed by (x + y * leds_wide) over the entire wall
+        self.journal = Journal()
+        self.dirty = set()          # crates changed since the last autosave
+        self.header_dirty = False   # wall settings changed since the last autosave
+        self._output_map = None # compiled on demand, dropped whenever crate indices, layouts or extra pixels change
+        self._encoder = None
+        self.crates = []            # column by column
+        for x in range(self.width):
+            for y in range(self.height):
+                self.crates.append(self.crate_class(self, self.crate_width, self.crate_height, self.crate_layout, y, x, self.width * self.height))
+
+    @classmethod
+    def from_snapshot(cls, snapshot) -> "Wall":
+        # snapshot is a project.WallSnapshot
+        wall = cls(snapshot.name, snapshot.width, snapshot.height, snapshot.crate_width, snapshot.crate_height, snapshot.crate_layout)
+        wall.restore(snapshot)
+        return wall
+
+    @property
+    def leds_wide(self) -> int:
+        return self.width * self.crate_width
+
+    @property
+    def leds_high(self) -> int:
+        return self.height * self.crate_height
+
+    def cell(self, crate:Crate, x:int, y:int) -> int:
+        return crate.col * crate.width + x + (crate.row * crate.height + y) * self.leds_wide
+
+    def crate_at(self, cell:int) -> Crate:
+        y, x = divmod(cell, self.leds_wide)
+        return self.crates[y // self.crate_height + x // self.crate_width * self.height]
+
+    def load_frame(self, rgb:bytes) -> list[int]:
+        # replace colors of the entire wall as a single undoable edit, returns the cells that changed
+        cells = [cell for cell in range(len(rgb) // 3) if self.frame[3 * cell:3 * cell + 3] != rgb[3 * cell:3 * cell + 3]]
+        if not cells:
+            return cells # an identical frame is no edit, and keeps the redo history
+        self.journal.record(self.frame, cells, b"".join(rgb[3 * cell:3 * cell + 3] for cell in cells))
+        self.frame[:len(rgb)] = rgb
+        self.dirty.update(self.crate_at(cell) for cell in cells)
+        return cells
+
+    def output_map(self):
+        if self._output_map is None:
+            crates = ((crate.idx, crate.col, crate.row, crate.layout, crate.extra_pixel) for crate in self.crates)
+            self._output_map = compile_output_map(crates, self.width, self.height, self.crate_width, self.crate_height)
+        return self._output_map
+
+    def encoder(self) -> FrameEncoder:
+        if self._encoder is None:
+            self._encoder = FrameEncoder(self.output_map(), self.channel_order, self.pipeline)
+        return self._encoder
+
+    def invalidate_output_map(self) -> None:
+        self._output_map = None
+        self._encoder = None
+
+    def set_output(self, channel_order:str, pipeline) -> None:
+        self.channel_order = channel_order
+        self.pipeline = pipeline
+        self._encoder = None
+
+    def restore(self, snapshot) -> None:
+        # state of a loaded project.WallSnapshot
+        for crate, (idx, layout, extra_pixel) in zip(self.crates, snapshot.crates):
+            crate.idx = idx
+            crate.layout = layout
+            crate.extra_pixel = extra_pixel
+        self.frame[:len(snapshot.frame)] = snapshot.frame
+        self.color = snapshot.color
+        self.set_output(snapshot.channel_order, output_pipeline(snapshot.gamma, snapshot.brightness, snapshot.max_amps))
+        self.invalidate_output_map()
+
+    def file_name(self) -> str:
+        return f"./{self.name}_w{self.width}_h{self.height}_cw{self.crate_width}_ch{self.crate_height}"
+
+    def save(self, path:str|None=None) -> str:
+        # single frame .crate of the current colors, raises ValueError if the crates can not be chained
+        path = path or f"{self.file_name()}.crate"
+        encoder = self.encoder()
+        with open(path, "wb+") as f:
+            encoder.write(self.frame, f)
+        return path
@@ -0,0 +1,69 @@
+from array import array
+from functools import lru_cache
+from typing import Iterable
+
+# direction of wiring of every layout, as if one looks at the front side of the crate:
+# (rows first, rows/columns are walked in reverse, first row/column is walked in reverse)
+LAYOUTS = {
+    "Layout1": (True, True, False),    # horisontal, bottom->top, first row left->right
+    "Layout2": (True, False, False),   # horisontal, top->bottom, first row left->right
+    "Layout3": (True, False, True),    # horisontal, top->bottom, first row right->left
+    "Layout4": (True, True, True),     # horisontal, bottom->top, first row right->left
+    "Layout5": (False, False, True),   # vertical, left->right, first column bottom->top
+    "Layout6": (False, False, False),  # vertical, left->right, first column top->bottom
+    "Layout7": (False, True, False),   # vertical, right->left, first column top->bottom
+    "Layout8": (False, True, True),    # vertical, right->left, first column bottom->top
+}
+
+@lru_cache(maxsize=None)
+def layout_order(layout:str, width:int, height:int) -> tuple[int, ...]:
+    # local pixel (x + width*y) of every LED of the crate, in the order of wiring
+    rows, major_reversed, minor_reversed = LAYOUTS[layout]
+    major, minor = (height, width) if rows else (width, height)
+    order = []
+    for i, m in enumerate(range(major - 1, -1, -1) if major_reversed else range(major)):
+        line = range(minor - 1, -1, -1) if (i % 2 == 0) == minor_reversed else range(minor)
+        if rows:
+            order.extend(x + width * m for x in line)
+        else:
+            order.extend(m + width * y for y in line)
+    return tuple(order)
+
+class OutputMap:
+    def __init__(self, cells:array, width:int, height:int) -> None:
+        self.cells = cells                  # wall cell of every LED in the stream, `size` for the extra pixels between crates
+        self.width = width                  # wall size in LEDs, ie width*crate_width x height*crate_height
+        self.height = height
+        self.size = width * height
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    def translate(self, x:int, y:int, width:int, height:int) -> "OutputMap":
+        # the same stream, gathered from a region of a larger canvas with its top left corner at (x, y)
+        if x < 0 or y < 0 or x + self.width > width or y + self.height > height:
+            raise ValueError(f"Wall of {self.width}x{self.height} LEDs at ({x}, {y}) does not fit into {width}x{height}")
+        size = width * height
+        cells = array("i", (size if cell == self.size else x + cell % self.width + (y + cell // self.width) * width for cell in self.cells))
+        return OutputMap(cells, width, height)
+
+def compile_output_map(crates:Iterable[tuple[int, int, int, str, bool]], width:int, height:int, crate_width:int, crate_height:int) -> OutputMap:
+    # crates are (idx, col, row, layout, extra_pixel), crates with negative idx are excluded from the chain
+    wall_width = width * crate_width
+    size = wall_width * height * crate_height
+    chain = {}
+    for crate in crates:
+        idx = crate[0]
+        if idx < 0:
+            continue
+        if idx in chain:
+            raise ValueError(f"Duplicate crate index {idx}")
+        chain[idx] = crate
+    cells = array("i")
+    for idx in sorted(chain):
+        _, col, row, layout, extra_pixel = chain[idx]
+        origin = col * crate_width + row * crate_height * wall_width
+        cells.extend(origin + pixel % crate_width + pixel // crate_width * wall_width for pixel in layout_order(layout, crate_width, crate_height))
+        if extra_pixel:
+            cells.append(size)
+    return OutputMap(cells, wall_width, height * crate_height)
@@ -0,0 +1,237 @@
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Callable, Iterable, TextIO
+
+from encoder import FrameEncoder
+
+# Real-time playback: a decode thread pulls frames from a source (effects.frames, importer.resample, ...) into a ring
+# of preallocated slots, an output thread takes them against a monotonic clock and hands them to a sink. The ring is
+# filled before the clock starts. A frame that is more than a frame period late is skipped when the next one is already
+# decoded, so a stall of the sink does not shift the rest of the show. Only when the ring runs empty, because the source
+# cannot keep up, is the late frame output and the clock moved to it, so a slow source plays slower instead of losing
+# all of its frames. A GUI previews the latest frame at its own, lower rate with latest() and never blocks either thread.
+
+class RingBuffer:
+    # single producer, single consumer, frames are copied once into a slot and handed out in place
+    def __init__(self, slots:int, size:int) -> None:
+        self.slots = [bytearray(size) for _ in range(slots)]
+        self.read = 0
+        self.count = 0
+        self.closed = False # no more frames will be written
+        self._condition = threading.Condition()
+
+    def writable(self, stop:threading.Event) -> bytearray|None:
+        # the next free slot, waits while the ring is full, None once stopped
+        with self._condition:
+            while self.count == len(self.slots) and not stop.is_set():
+                self._condition.wait(0.1)
+            return None if stop.is_set() else self.slots[(self.read + self.count) % len(self.slots)]
+
+    def commit(self) -> None:
+        with self._condition:
+            self.count += 1
+            self._condition.notify_all()
+
+    def filled(self, stop:threading.Event) -> None:
+        # waits until every slot holds a frame, or no more frames will come
+        with self._condition:
+            while self.count < len(self.slots) and not self.closed and not stop.is_set():
+                self._condition.wait(0.1)
+
+    def readable(self, timeout:float) -> bytearray|None:
+        # the oldest frame, None if there is none within timeout or the ring is closed and empty
+        with self._condition:
+            if not self.count and not self.closed:
+                self._condition.wait(timeout)
+            return self.slots[self.read] if self.count else None
+
+    def release(self) -> None:
+        with self._condition:
+            self.read = (self.read + 1) % len(self.slots)
+            self.count -= 1
+            self._condition.notify_all()
+
+    def close(self) -> None:
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+    def finished(self) -> bool:
+        with self._condition:
+            return self.closed and not self.count
+
+class Metrics:
+    def __init__(self, window:int=120) -> None:
+        self.frames = 0     # frames output
+        self.dropped = 0    # frames skipped because they were a frame period late while the next one was ready
+        self.rebased = 0    # times the clock was moved because the source could not deliver frames in time
+        self.underruns = 0  # frames that were not decoded yet when they were due
+        self.buffered = 0   # frames in the ring at the last output
+        self.lateness = deque(maxlen=window) # seconds between due and actual output time, of the last frames
+        self.times = deque(maxlen=window)    # monotonic output times of the last frames
+        self.stages = {}                     # seconds spent per frame by every stage, eg decode, encode, output, preview
+
+    def stage(self, name:str, seconds:float) -> None:
+        self.stages.setdefault(name, deque(maxlen=self.lateness.maxlen)).append(seconds)
+
+    def fps(self) -> float:
+        times = list(self.times)
+        return (len(times) - 1) / (times[-1] - times[0]) if len(times) > 1 and times[-1] > times[0] else 0.0
+
+    def jitter(self) -> float:
+        # standard deviation of the output times against the clock, in seconds
+        lateness = list(self.lateness)
+        return statistics.pstdev(lateness) if len(lateness) > 1 else 0.0
+
+    def report(self) -> str:
+        stages = "".join(f"  {name} {1000 * statistics.fmean(times):.2f} ms" for name, times in list(self.stages.items()) if times)
+        return f"{self.fps():5.1f} fps  jitter {1000 * self.jitter():.2f} ms  dropped {self.dropped}  rebased {self.rebased}  underruns {self.underruns}  buffered {self.buffered}{stages}"
+
+class Restartable:
+    # a source that can be played more than once, every iteration calls function for a new iterator, eg to reopen a file
+    def __init__(self, function:Callable[[], Iterable]) -> None:
+        self.function = function
+
+    def __iter__(self):
+        return iter(self.function())
+
+class Player:
+    log_interval = 1.0 # seconds between lines of the log
+
+    def __init__(self, source:Iterable, sink:Callable|None, fps:float, frame_size:int, encoder:FrameEncoder|None=None, slots:int=8, repeat:bool=False, log:TextIO|None=None) -> None:
+        self.source = source         # frames in the layout of encoder.new_frame, shorter frames leave the rest black
+        self.sink = sink             # called on the output thread, with the encoded frame if there is an encoder
+        self.fps = fps
+        self.encoder = encoder
+        self.repeat = repeat         # start over at the end, the source must be iterable more than once, eg a list
+        self.log = log               # file that gets a line of metrics every log_interval
+        self.ring = RingBuffer(slots, frame_size)
+        self.metrics = Metrics(window=max(2, round(2 * fps)))
+        self.error = None            # exception that stopped playback
+        self._latest = bytearray(frame_size)
+        self._latest_index = -1      # index of the frame in _latest, -1 before the first one
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self) -> None:
+        self._threads = [threading.Thread(target=self._decode, name="Player decode", daemon=True),
+                         threading.Thread(target=self._output, name="Player output", daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def run(self) -> None:
+        # plays on the calling thread until the source is exhausted, or until interrupted
+        self.start()
+        try:
+            while self._threads[1].is_alive():
+                self._threads[1].join(0.2)
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+
+    def running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def latest(self, known:int=-1) -> tuple[int, bytes|None]:
+        # index and copy of the last frame output, None if it is still the frame with index known
+        with self._lock:
+            if self._latest_index == known:
+                return known, None
+            return self._latest_index, bytes(self._latest)
+
+    def _decode(self) -> None:
+        try:
+            while not self._stop.is_set():
+                frames = iter(self.source)
+                empty = True
+                while True:
+                    # waiting for a free slot is not part of the decode time
+                    start = time.perf_counter()
+                    frame = next(frames, None)
+                    if frame is None:
+                        break
+                    seconds = time.perf_counter() - start
+                    slot = self.ring.writable(self._stop)
+                    if slot is None:
+                        return
+                    start = time.perf_counter()
+                    slot[:len(frame)] = frame
+                    self.ring.commit()
+                    self.metrics.stage("decode", seconds + time.perf_counter() - start)
+                    empty = False
+                if not self.repeat or empty or frames is self.source:
+                    return
+        except Exception as e:
+            self.error = e
+        finally:
+            self.ring.close()
+
+    def _output(self) -> None:
+        period = 1 / self.fps
+        metrics = self.metrics
+        self.ring.filled(self._stop) # decoding ahead must not make the first frames late
+        clock = time.monotonic()
+        logged = clock
+        index = 0
+        starved = -1 # index of the last frame counted as an underrun
+        try:
+            while not self._stop.is_set():
+                due = clock + index * period
+                frame = self.ring.readable(max(0.0, due - time.monotonic()) + period)
+                if frame is None:
+                    if self.ring.finished():
+                        return
+                    if time.monotonic() > due and starved != index:
+                        metrics.underruns += 1
+                        starved = index
+                    continue
+                now = time.monotonic()
+                if now - due > period:
+                    if self.ring.count > 1:
+                        # late by more than a frame and the next one is ready, skip it to get back on the clock
+                        metrics.dropped += 1
+                        self.ring.release()
+                        index += 1
+                        continue
+                    # the source itself is behind, the frame is output now and the following ones are due from here
+                    metrics.rebased += 1
+                    clock = now - index * period
+                    due = now
+                if due > now and self._stop.wait(due - now):
+                    return
+                metrics.lateness.append(time.monotonic() - due)
+                if self.sink is not None:
+                    start = time.perf_counter()
+                    output = frame
+                    if self.encoder is not None:
+                        output = self.encoder.encode(frame)
+                        metrics.stage("encode", time.perf_counter() - start)
+                        start = time.perf_counter()
+                    self.sink(output)
+                    metrics.stage("output", time.perf_counter() - start)
+                with self._lock:
+                    self._latest[:] = frame
+                    self._latest_index = index
+                metrics.buffered = self.ring.count - 1
+                self.ring.release()
+                metrics.times.append(time.monotonic())
+                metrics.frames += 1
+                index += 1
+                if self.log is not None and metrics.times[-1] - logged >= self.log_interval:
+                    logged = metrics.times[-1]
+                    self.log.write(f"{time.strftime('%H:%M:%S')} frame {index}  {metrics.report()}\n")
+                    self.log.flush()
+        except Exception as e:
+            self.error = e
+        finally:
+            self._stop.set() # the decode thread may be waiting for a free slot
+            if self.log is not None:
+                self.log.write(f"{time.strftime('%H:%M:%S')} end after {metrics.frames} frames  {metrics.report()}\n")
+                self.log.flush()
@@ -0,0 +1,167 @@
+import os
+import queue
+import struct
+import threading
+
+from color import CHANNEL_ORDERS
+from output_map import LAYOUTS
+
+# Binary project file, little endian:
+#   HEADER                                        magic, version, number of walls
+#   per wall: WALL_HEADER, then one block per crate, in the order of Wall.crates (column by column)
+#   crate block: CRATE_HEADER, then the colors of the crate's LEDs, row by row
+# Every block has a fixed size and offset, so a crate is saved by overwriting its block in place.
+# Version 1 files have no output settings in WALL_HEADER_V1, they are read with the defaults and rewritten as version 2.
+MAGIC = b"CRTP"
+VERSION = 2
+HEADER = struct.Struct("<4sHH")                     # magic, version, wall count
+WALL_HEADER = struct.Struct("<64sHHHHB3s3sddd")     # name, width, height, crate width, crate height, default layout, current color,
+                                                    # channel order, gamma, brightness, power limit in amps
+WALL_HEADER_V1 = struct.Struct("<64sHHHHB3s")
+CRATE_HEADER = struct.Struct("<iBB")          # idx, layout, extra pixel
+LAYOUT_NAMES = list(LAYOUTS)
+
+class WallSnapshot:
+    def __init__(self, name:str, width:int, height:int, crate_width:int, crate_height:int, crate_layout:str, color:tuple, channel_order:str="RGB", gamma:float=1.0, brightness:float=1.0, max_amps:float=0.0, version:int=VERSION) -> None:
+        self.name = name
+        self.width = width
+        self.height = height
+        self.crate_width = crate_width
+        self.crate_height = crate_height
+        self.crate_layout = crate_layout
+        self.color = color
+        self.channel_order = channel_order
+        self.gamma = gamma
+        self.brightness = brightness
+        self.max_amps = max_amps
+        self.version = version # of the file, older files are not patched in place but rewritten
+        self.crates = []   # (idx, layout, extra_pixel) in the order of Wall.crates
+        self.frame = None  # rgb of every LED of the wall, row by row
+
+def _block_size(wall) -> int:
+    return CRATE_HEADER.size + 3 * wall.crate_width * wall.crate_height
+
+def wall_offsets(walls) -> list[int]:
+    # offset of the first crate block of every wall
+    offsets = []
+    offset = HEADER.size
+    for wall in walls:
+        offset += WALL_HEADER.size
+        offsets.append(offset)
+        offset += len(wall.crates) * _block_size(wall)
+    return offsets
+
+def crate_block(wall, crate) -> bytes:
+    # wall is a Wall or anything with the same attributes, crate one of its crates
+    stride = 3 * wall.width * wall.crate_width
+    start = 3 * (crate.col * wall.crate_width + crate.row * wall.crate_height * wall.width * wall.crate_width)
+    rows = [wall.frame[start + y * stride:start + y * stride + 3 * wall.crate_width] for y in range(wall.crate_height)]
+    return CRATE_HEADER.pack(crate.idx, LAYOUT_NAMES.index(crate.layout), crate.extra_pixel) + b"".join(rows)
+
+def wall_header(wall) -> bytes:
+    pipeline = wall.pipeline
+    output = (pipeline.gamma, pipeline.brightness, pipeline.max_amps) if pipeline is not None else (1.0, 1.0, 0.0)
+    return WALL_HEADER.pack(wall.name.encode()[:64], wall.width, wall.height, wall.crate_width, wall.crate_height, LAYOUT_NAMES.index(wall.crate_layout), bytes(wall.color), wall.channel_order.encode(), *output)
+
+def patches(walls, dirty:dict[int, set[int]]) -> list[tuple[int, bytes]]:
+    # (offset, data) pairs that bring a saved project up to date, dirty maps the index of a wall to the indices of its changed crates
+    offsets = wall_offsets(walls)
+    result = []
+    for index, crates in dirty.items():
+        wall = walls[index]
+        result.append((offsets[index] - WALL_HEADER.size, wall_header(wall)))
+        result.extend((offsets[index] + crate * _block_size(wall), crate_block(wall, wall.crates[crate])) for crate in sorted(crates))
+    return result
+
+def pack(walls) -> bytes:
+    data = [HEADER.pack(MAGIC, VERSION, len(walls))]
+    for wall in walls:
+        data.append(wall_header(wall))
+        data.extend(crate_block(wall, crate) for crate in wall.crates)
+    return b"".join(data)
+
+def load(path:str) -> list[WallSnapshot]:
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        return _unpack(data, path)
+    except (struct.error, IndexError) as e:
+        raise ValueError(f"{path} is truncated or corrupt: {e}")
+
+def _unpack(data:bytes, path:str) -> list[WallSnapshot]:
+    magic, version, count = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a CrateLight project")
+    if version > VERSION:
+        raise ValueError(f"{path}: unsupported project version {version}")
+    walls = []
+    offset = HEADER.size
+    wall_header = WALL_HEADER if version >= 2 else WALL_HEADER_V1
+    for _ in range(count):
+        name, width, height, crate_width, crate_height, layout, color, *output = wall_header.unpack_from(data, offset)
+        offset += wall_header.size
+        wall = WallSnapshot(name.rstrip(b"\0").decode(errors="ignore"), width, height, crate_width, crate_height, LAYOUT_NAMES[layout], tuple(color), version=version)
+        if output:
+            channel_order, wall.gamma, wall.brightness, wall.max_amps = output
+            wall.channel_order = channel_order.decode(errors="ignore")
+            if wall.channel_order not in CHANNEL_ORDERS:
+                raise ValueError(f"{path}: unknown channel order {wall.channel_order} of wall {wall.name}")
+        if len(data) < offset + width * height * (CRATE_HEADER.size + 3 * crate_width * crate_height):
+            raise ValueError(f"{path} is truncated")
+        wall.frame = bytearray(3 * width * crate_width * height * crate_height)
+        stride = 3 * width * crate_width
+        row = 3 * crate_width
+        for col in range(width):
+            for crate_row in range(height):
+                idx, layout, extra_pixel = CRATE_HEADER.unpack_from(data, offset)
+                wall.crates.append((idx, LAYOUT_NAMES[layout], bool(extra_pixel)))
+                pixels = offset + CRATE_HEADER.size
+                start = 3 * (col * crate_width + crate_row * crate_height * width * crate_width)
+                for y in range(crate_height):
+                    wall.frame[start + y * stride:start + y * stride + row] = data[pixels + y * row:pixels + (y + 1) * row]
+                offset = pixels + crate_height * row
+        walls.append(wall)
+    return walls
+
+class Autosave:
+    # writes snapshots prepared on the Tk thread from a background thread, so disk I/O never blocks the mainloop
+    def __init__(self, path:str) -> None:
+        self.path = path
+        self.error = None
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="Autosave", daemon=True)
+        self._thread.start()
+
+    def write_all(self, data:bytes) -> None:
+        self._queue.put((None, data))
+
+    def write_patches(self, patches:list[tuple[int, bytes]]) -> None:
+        self._queue.put((patches, None))
+
+    def _run(self) -> None:
+        while True:
+            patches, data = self._queue.get()
+            try:
+                if patches is None and data is None:
+                    return
+                if data is not None:
+                    # replace the whole file atomically, a crash never leaves a half written project behind
+                    with open(self.path + ".tmp", "wb") as f:
+                        f.write(data)
+                    os.replace(self.path + ".tmp", self.path)
+                else:
+                    with open(self.path, "r+b") as f:
+                        for offset, block in patches:
+                            f.seek(offset)
+                            f.write(block)
+            except OSError as e:
+                self.error = e
+            finally:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        self._queue.join()
+
+    def close(self) -> None:
+        self._queue.put((None, None))
+        self._thread.join()
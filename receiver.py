@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import time
+
+from sender import UDP_HEADER, TCP_HEADER, DEFAULT_PORT
+from codec import DeltaDecoder, is_key
+
+# local stand-in for the Raspberry Pi, reports received frames per second and latency
+
+class Stats:
+    def __init__(self, compressed:bool=False) -> None:
+        self.decoder = DeltaDecoder() if compressed else None
+        self.waiting_for_key = True
+        self.frames = 0
+        self.lost = 0
+        self.latency = 0.0
+        self.max_latency = 0.0
+        self.last_sequence = None
+        self.size = 0
+
+    def frame(self, sequence:int, sent:float, data:bytes) -> None:
+        if self.last_sequence is not None and sequence > self.last_sequence + 1:
+            self.lost += sequence - self.last_sequence - 1
+            self.waiting_for_key = True
+        self.last_sequence = sequence
+        if self.decoder is not None:
+            # after a lost frame, deltas can not be applied until the next keyframe
+            if self.waiting_for_key and not is_key(data):
+                return
+            self.waiting_for_key = False
+            self.decoder.decode(data)
+        latency = time.time() - sent
+        self.frames += 1
+        self.size = len(data)
+        self.latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    def report(self, elapsed:float) -> str:
+        line = f"{self.frames / elapsed:6.1f} fps, {self.size} bytes/frame, latency avg {1000 * self.latency / max(self.frames, 1):6.2f} ms, max {1000 * self.max_latency:6.2f} ms, lost {self.lost}"
+        if self.decoder is not None:
+            line += f", decoded {self.decoder.stats.report()}"
+        self.frames = self.lost = 0
+        self.latency = self.max_latency = 0.0
+        return line
+
+class UdpReceiver(asyncio.DatagramProtocol):
+    def __init__(self, stats:Stats) -> None:
+        self.stats = stats
+        self.sequence = None
+        self.chunks = {}
+
+    def datagram_received(self, data:bytes, addr) -> None:
+        sequence, sent, chunk, count = UDP_HEADER.unpack_from(data)
+        if sequence != self.sequence:
+            # a newer frame started, whatever is left of the previous one is lost
+            self.sequence = sequence
+            self.chunks = {}
+        self.chunks[chunk] = data[UDP_HEADER.size:]
+        if len(self.chunks) == count:
+            self.stats.frame(sequence, sent, b"".join(self.chunks[chunk] for chunk in range(count)))
+            self.chunks = {}
+
+async def handle_tcp(stats:Stats, reader:asyncio.StreamReader, writer:asyncio.StreamWriter) -> None:
+    try:
+        while True:
+            sequence, sent, length = TCP_HEADER.unpack(await reader.readexactly(TCP_HEADER.size))
+            stats.frame(sequence, sent, await reader.readexactly(length))
+    except asyncio.IncompleteReadError:
+        pass
+    finally:
+        writer.close()
+
+async def serve(host:str, port:int, protocol:str, compressed:bool) -> None:
+    loop = asyncio.get_running_loop()
+    stats = Stats(compressed)
+    if protocol == "udp":
+        await loop.create_datagram_endpoint(lambda: UdpReceiver(stats), local_addr=(host, port))
+    else:
+        await asyncio.start_server(lambda reader, writer: handle_tcp(stats, reader, writer), host, port)
+    print(f"Listening on {protocol}://{host}:{port}")
+    start = loop.time()
+    while True:
+        await asyncio.sleep(1)
+        now = loop.time()
+        print(stats.report(now - start), flush=True)
+        start = now
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Receive frames sent by the CrateLight GUI and report fps and latency")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--tcp", action="store_true", help="listen on TCP instead of UDP")
+    parser.add_argument("--compressed", action="store_true", help="frames are sent with compress=True")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, "tcp" if args.tcp else "udp", args.compressed))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,210 @@
+import argparse
+import sys
+import time
+
+import project
+from color import CHANNEL_ORDERS, ColorPipeline, output_pipeline
+from model import Wall
+
+# Renders a Wall of a saved project without a display:
+#   python3 render.py show.cratelight                                    the stored colors, as a single-frame .crate
+#   ffmpeg -i clip.mp4 -f image2pipe -vcodec ppm - | python3 render.py show.cratelight - -o clip.crate
+#   python3 render.py show.cratelight frames/*.ppm --send udp://raspberrypi.local --fps 25
+#   python3 render.py show.cratelight --effect plasma --duration 60 --send udp://raspberrypi.local
+#   python3 render.py show.cratelight --wall Left --wall Right --effect text --text HELLO --send udp://pi-left --send udp://pi-right
+# Only modules without tkinter are imported, PNG and GIF input is the one exception and needs a display.
+
+def parse_size(value:str) -> tuple[int, int]:
+    width, _, height = value.lower().partition("x")
+    try:
+        return int(width), int(height)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected WIDTHxHEIGHT, got {value}")
+
+def number(value:str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected a number, got {value}")
+
+# the same rules as the Output dialog of the GUI
+def positive(value:str) -> float:
+    result = number(value)
+    if not result > 0:
+        raise argparse.ArgumentTypeError(f"Expected a positive number, got {value}")
+    return result
+
+def not_negative(value:str) -> float:
+    result = number(value)
+    if not result >= 0:
+        raise argparse.ArgumentTypeError(f"Expected a number of at least 0, got {value}")
+    return result
+
+def fraction(value:str) -> float:
+    result = number(value)
+    if not 0 <= result <= 1:
+        raise argparse.ArgumentTypeError(f"Expected a number from 0 to 1, got {value}")
+    return result
+
+def select_wall(snapshots:list[project.WallSnapshot], name:str|None) -> project.WallSnapshot:
+    if not snapshots:
+        raise ValueError("The project has no walls")
+    if name is None:
+        return snapshots[0]
+    for index, snapshot in enumerate(snapshots):
+        if name in (snapshot.name, str(index)):
+            return snapshot
+    raise ValueError(f"No wall {name}, the project has {', '.join(snapshot.name for snapshot in snapshots)}")
+
+def output_settings(wall:Wall, args:argparse.Namespace) -> None:
+    # the settings stored with the wall, unless they are given on the command line
+    stored = wall.pipeline or ColorPipeline(gamma=1.0)
+    gamma = stored.gamma if args.gamma is None else args.gamma
+    brightness = stored.brightness if args.brightness is None else args.brightness
+    max_amps = stored.max_amps if args.max_amps is None else args.max_amps
+    wall.set_output(args.order or wall.channel_order, output_pipeline(gamma, brightness, max_amps))
+
+def span(walls:list[Wall], sinks:list):
+    # the walls side by side on one canvas, left to right in the given order, each one output to its sink
+    from session import Session
+    session = Session(sum(wall.leds_wide for wall in walls), max(wall.leds_high for wall in walls))
+    x = 0
+    for wall, sink in zip(walls, sinks):
+        session.add(wall.output_map(), x, 0, sink, wall.channel_order, wall.pipeline)
+        x += wall.leds_wide
+    return session
+
+def stored(walls:list[Wall], width:int, height:int) -> bytes:
+    # the stored colors of the walls, placed on the canvas like span places them
+    canvas = bytearray(3 * width * height)
+    x = 0
+    for wall in walls:
+        row_size = 3 * wall.leds_wide
+        for row in range(wall.leds_high):
+            start = 3 * (x + row * width)
+            canvas[start:start + row_size] = wall.frame[row * row_size:(row + 1) * row_size]
+        x += wall.leds_wide
+    return bytes(canvas)
+
+def sources(inputs:list[str], raw:tuple[int, int]|None):
+    # (rgb, width, height) of every input frame, lazily, "-" reads stdin
+    from importer import open_source, read_ppm, read_raw
+    for path in inputs:
+        if path == "-":
+            yield from read_raw(sys.stdin.buffer, *raw) if raw else read_ppm(sys.stdin.buffer)
+        elif raw:
+            with open(path, "rb") as f:
+                yield from read_raw(f, *raw)
+        else:
+            yield from open_source(path)
+
+def main(argv:list[str]|None=None) -> int:
+    parser = argparse.ArgumentParser(description="Render frames onto a Wall of a CrateLight project, to a .crate file or a receiver")
+    parser.add_argument("project", help=".cratelight file with the crate indices and layouts of the wall")
+    parser.add_argument("inputs", nargs="*", help="PPM/PNM files or streams, PNG/GIF images, - for stdin; the stored colors of the wall if none")
+    parser.add_argument("--wall", action="append", help="name or index of the wall, the first one by default; repeated, the frames span the walls side by side")
+    parser.add_argument("--raw", type=parse_size, metavar="WxH", help="inputs are headless rgb24 frames of this size")
+    parser.add_argument("-o", "--output", help=".crate file of a single wall, <wall>_w.._h.._cw.._ch...crate by default")
+    parser.add_argument("--delta", action="store_true", help="store keyframes and deltas instead of raw frames")
+    parser.add_argument("--send", metavar="TARGET", action="append", help="stream to [udp://|tcp://]host[:port] instead of writing a file, once for every --wall")
+    parser.add_argument("--compress", action="store_true", help="send delta packets, for receivers started with --compressed")
+    parser.add_argument("--log", help="append playback metrics of --send to this file, once a second")
+    parser.add_argument("--loop", action="store_true", help="with --send and --effect, play until interrupted")
+    parser.add_argument("--fps", type=positive, default=30.0)
+    parser.add_argument("--order", type=str.upper, choices=CHANNEL_ORDERS, help="channel order of the LED strip, eg GRB; the output settings default to the ones stored with the wall")
+    parser.add_argument("--gamma", type=positive)
+    parser.add_argument("--brightness", type=fraction, help="0..1")
+    parser.add_argument("--max-amps", type=not_negative, help="power limit, 0 disables it")
+    parser.add_argument("--effect", help="generate frames instead of reading inputs, one of effects.EFFECTS")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of a generated effect")
+    parser.add_argument("--text", help="text of the text effect")
+    parser.add_argument("--workers", type=int, default=None, help="processes resampling the inputs, one per CPU by default")
+    args = parser.parse_args(argv)
+
+    try:
+        snapshots = project.load(args.project)
+        walls = [Wall.from_snapshot(select_wall(snapshots, name)) for name in args.wall or [None]]
+        if args.send and len(args.send) != len(walls):
+            raise ValueError(f"Expected a --send target for each of the {len(walls)} walls, got {len(args.send)}")
+        if args.output and len(walls) > 1:
+            raise ValueError("-o names the file of a single wall, the files of several walls are named after them")
+        for wall in walls:
+            output_settings(wall, args)
+            wall.output_map() # duplicate crate indices are reported before anything is written or sent
+    except (OSError, ValueError) as e:
+        print(f"render: {e}", file=sys.stderr)
+        return 1
+    width, height = sum(wall.leds_wide for wall in walls), max(wall.leds_high for wall in walls)
+
+    if args.effect:
+        import effects
+        try:
+            effect = effects.create(args.effect, width, height, **({"text": args.text} if args.text else {}))
+        except (TypeError, ValueError) as e:
+            print(f"render: {e}", file=sys.stderr)
+            return 1
+        frames = effects.frames(effect, args.fps, None if args.loop and args.send else round(args.duration * args.fps))
+    elif args.inputs:
+        from importer import resample
+        frames = resample(sources(args.inputs, args.raw), width, height, workers=args.workers)
+    else:
+        frames = iter([stored(walls, width, height)])
+
+    start = time.monotonic()
+    try:
+        if args.send:
+            from sender import FrameSender, parse_target
+            from playback import Player
+            senders = [FrameSender(host, port, fps=0, protocol=protocol, compress=args.compress) for protocol, host, port in map(parse_target, args.send)]
+            session = span(walls, [sender.submit for sender in senders])
+            log = open(args.log, "a") if args.log else None
+            # the player paces the frames, the session encodes them for every wall and the senders send them as soon as they are handed over
+            player = Player(frames, session.render, args.fps, len(session.new_frame()), log=log)
+            for sender in senders:
+                sender.start()
+            try:
+                player.run()
+                time.sleep(1 / args.fps) # let the last frame go out
+            finally:
+                session.close()
+                for sender in senders:
+                    sender.stop()
+                if log is not None:
+                    log.close()
+            if player.error is not None:
+                raise player.error
+            for target, sender in zip(args.send, senders):
+                if sender.error is not None:
+                    raise OSError(f"sending to {target} failed: {sender.error}")
+            print(f"Sent {player.metrics.frames} frames to {', '.join(args.send)}, {player.metrics.report()}", file=sys.stderr)
+            for target, sender in zip(args.send, senders):
+                if sender.codec is not None:
+                    print(f"  {target} delta coded: {sender.codec.stats.report()}", file=sys.stderr)
+        elif not args.inputs and not args.effect:
+            for wall in walls:
+                print(f"Saved {wall.save(args.output)}", file=sys.stderr)
+        else:
+            from contextlib import ExitStack
+            from crate_file import CrateWriter, CODEC_RAW, CODEC_DELTA
+            paths = [args.output or f"{wall.file_name()}.crate" for wall in walls]
+            with ExitStack() as stack:
+                writers = [stack.enter_context(CrateWriter(path, wall.width, wall.height, wall.crate_width, wall.crate_height, 3 * len(wall.output_map()), fps=args.fps, codec=CODEC_DELTA if args.delta else CODEC_RAW))
+                           for path, wall in zip(paths, walls)]
+                session = stack.enter_context(span(walls, [writer.write for writer in writers]))
+                canvas = session.new_frame()
+                for rgb in frames:
+                    canvas[:len(rgb)] = rgb
+                    session.render(canvas)
+            print(f"Saved {len(writers[0])} frames to {', '.join(paths)} in {time.monotonic() - start:.2f} s", file=sys.stderr)
+            for path, writer in zip(paths, writers):
+                if writer.encoder is not None:
+                    print(f"  {path} delta coded: {writer.encoder.stats.report()}", file=sys.stderr)
+    except (OSError, ValueError) as e:
+        print(f"render: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+import asyncio
+import struct
+import threading
+import time
+
+from codec import DeltaEncoder
+
+# every frame is prefixed with its sequence number and the wall clock time it was sent at,
+# over UDP a frame is split into datagrams of at most CHUNK_SIZE bytes of payload,
+# compressed frames are packets of codec.py instead of raw LED streams
+UDP_HEADER = struct.Struct("<IdHH") # sequence, send time, chunk, chunk count
+TCP_HEADER = struct.Struct("<IdI")  # sequence, send time, length
+CHUNK_SIZE = 1400
+DEFAULT_PORT = 7777
+
+def parse_target(target:str) -> tuple[str, str, int]:
+    # "[udp://|tcp://]host[:port]" -> (protocol, host, port)
+    protocol, _, address = target.rpartition("://")
+    host, _, port = address.partition(":")
+    return protocol or "udp", host or "127.0.0.1", int(port) if port else DEFAULT_PORT
+
+class FrameSender:
+    def __init__(self, host:str, port:int=DEFAULT_PORT, fps:float=30.0, protocol:str="udp", max_buffer:int=1 << 20, compress:bool=False) -> None:
+        if protocol not in ("udp", "tcp"):
+            raise ValueError(f"Unsupported protocol {protocol}")
+        self.host = host
+        self.port = port
+        self.fps = fps               # 0 sends every frame as soon as it is submitted, when frames are already paced by the caller
+        self.protocol = protocol
+        self.max_buffer = max_buffer # bytes queued in the transport before frames are dropped
+        self.sent = 0                # frames handed to the transport
+        self.dropped = 0             # frames replaced by a newer one or refused because the link fell behind
+        self.late = 0                # ticks missed because sending took longer than the frame period
+        self.error = None            # exception that stopped the sender
+        self.codec = DeltaEncoder(key_interval=max(1, round(fps or 30))) if compress else None # a keyframe every second lets the receiver recover from lost datagrams
+        self._frame = None
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._task = None
+        self._wakeup = None
+
+    def start(self) -> None:
+        # the event loop runs on its own thread, so neither connecting nor sending blocks the Tk mainloop
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name=f"FrameSender {self.host}:{self.port}", daemon=True)
+        self._thread.start()
+        self._task = asyncio.run_coroutine_threadsafe(self._run(), self._loop)
+
+    def submit(self, frame) -> None:
+        # thread-safe, only the latest frame is kept until the next tick
+        frame = bytes(frame)
+        with self._lock:
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = frame
+        if not self.fps and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def stop(self) -> None:
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=1)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=1)
+        self._loop.close()
+        self._loop = None
+
+    async def _shutdown(self) -> None:
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _take(self):
+        with self._lock:
+            frame, self._frame = self._frame, None
+        return frame
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            if self.protocol == "udp":
+                transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=(self.host, self.port))
+                writer = None
+            else:
+                _, writer = await asyncio.open_connection(self.host, self.port)
+                transport = writer.transport
+            try:
+                await self._pace(loop, transport, writer)
+            finally:
+                transport.close()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.error = e
+
+    async def _pace(self, loop, transport, writer) -> None:
+        if not self.fps:
+            self._wakeup = asyncio.Event()
+        period = 1 / self.fps if self.fps else 0
+        tick = loop.time()
+        while True:
+            frame = self._take()
+            if frame is None and self._wakeup is not None:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            if frame is not None:
+                if transport.get_write_buffer_size() > self.max_buffer:
+                    self.dropped += 1
+                else:
+                    self._send(transport, frame)
+                    if writer is not None:
+                        await writer.drain()
+            if self._wakeup is not None:
+                continue
+            tick += period
+            delay = tick - loop.time()
+            if delay < 0:
+                # fell behind, skip the missed ticks instead of bursting to catch up
+                missed = int(-delay // period) + 1
+                self.late += missed
+                tick += missed * period
+                delay = tick - loop.time()
+            await asyncio.sleep(delay)
+
+    def _send(self, transport, frame:bytes) -> None:
+        sequence = self._sequence
+        self._sequence = (sequence + 1) & 0xffffffff
+        now = time.time()
+        if self.codec is not None:
+            frame = self.codec.encode(frame)
+        if self.protocol == "tcp":
+            transport.write(TCP_HEADER.pack(sequence, now, len(frame)) + frame)
+        else:
+            view = memoryview(frame)
+            count = max(1, -(-len(frame) // CHUNK_SIZE))
+            for chunk in range(count):
+                transport.sendto(UDP_HEADER.pack(sequence, now, chunk, count) + view[chunk * CHUNK_SIZE:(chunk + 1) * CHUNK_SIZE])
+        self.sent += 1
@@ -0,0 +1,81 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable
+
+from color import ColorPipeline
+from encoder import FrameEncoder, new_frame
+from output_map import OutputMap
+
+# One logical canvas split across several Walls. Every Wall gathers its LED stream straight from its region of the
+# canvas, all Walls encode concurrently and hand their frames to the outputs together, once every one of them is ready.
+# The gather of FrameEncoder holds the GIL, so the threads do not encode in parallel: the pool overlaps the outputs,
+# socket sends and file writes that release the GIL, and keeps the Walls in lockstep, it does not speed up encoding.
+# Session.render is the sink of a playback.Player, which paces the frames.
+
+class WallOutput:
+    def __init__(self, output_map:OutputMap, x:int, y:int, canvas_width:int, canvas_height:int, sink:Callable, channel_order:str="RGB", pipeline:ColorPipeline|None=None) -> None:
+        self.output_map = output_map
+        self.x = x
+        self.y = y
+        self.encoder = FrameEncoder(output_map.translate(x, y, canvas_width, canvas_height), channel_order, pipeline)
+        self.sink = sink # called with the encoded frame, eg FrameSender.submit or CrateWriter.write
+
+class Session:
+    def __init__(self, width:int, height:int) -> None:
+        self.width = width   # logical canvas in LEDs
+        self.height = height
+        self.outputs = []
+        self.rendered = 0    # frames sent to every wall
+        self._pool = None
+        self._barrier = None
+
+    def add(self, output_map:OutputMap, x:int, y:int, sink:Callable, channel_order:str="RGB", pipeline:ColorPipeline|None=None) -> WallOutput:
+        output = WallOutput(output_map, x, y, self.width, self.height, sink, channel_order, pipeline)
+        self.outputs.append(output)
+        self._shutdown()
+        return output
+
+    def new_frame(self) -> bytearray:
+        return new_frame(self.width * self.height)
+
+    def _start(self) -> None:
+        self._pool = ThreadPoolExecutor(len(self.outputs), thread_name_prefix="Session")
+        self._barrier = threading.Barrier(len(self.outputs))
+
+    def _shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _output(self, output:WallOutput, frame:bytearray) -> None:
+        try:
+            view = output.encoder.encode(frame)
+        except BaseException:
+            self._barrier.abort()
+            raise
+        self._barrier.wait() # no wall goes out before every wall is encoded
+        output.sink(view)
+
+    def render(self, frame:bytearray) -> None:
+        # one frame of the logical canvas to every wall, in lockstep
+        if not self.outputs:
+            return
+        if self._pool is None:
+            self._start()
+        futures = [self._pool.submit(self._output, output, frame) for output in self.outputs]
+        wait(futures)
+        errors = [future.exception() for future in futures if future.exception() is not None]
+        if errors:
+            self._barrier.reset()
+            # walls released by an aborted barrier only report the error of the wall that failed
+            raise next((e for e in errors if not isinstance(e, threading.BrokenBarrierError)), errors[0])
+        self.rendered += 1
+
+    def close(self) -> None:
+        self._shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
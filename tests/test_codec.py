@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from codec import DeltaDecoder, DeltaEncoder, changed_cells, is_key
+
+def frames(count:int, leds:int, seed:int=1):
+    # runs of equal colors that move and change a little from frame to frame, like an animation
+    rng = random.Random(seed)
+    frame = bytearray(rng.randbytes(3 * leds))
+    for _ in range(count):
+        for _ in range(rng.randrange(4)):
+            start = rng.randrange(leds)
+            frame[3 * start:3 * start + 3 * rng.randrange(1, 20)] = rng.randbytes(3) * 20
+            del frame[3 * leds:]
+        yield bytes(frame)
+
+def test_round_trip():
+    encoder = DeltaEncoder(key_interval=10)
+    decoder = DeltaDecoder()
+    for frame in frames(50, 300):
+        assert bytes(decoder.decode(encoder.encode(frame))) == frame
+
+def test_keyframes_at_the_interval():
+    encoder = DeltaEncoder(key_interval=4)
+    kinds = [is_key(encoder.encode(frame)) for frame in frames(9, 50)]
+    assert kinds == [True, False, False, False, True, False, False, False, True]
+
+def test_edge_cases_round_trip():
+    encoder = DeltaEncoder()
+    decoder = DeltaDecoder()
+    for frame in [b"", b"\x01\x02\x03", bytes(30), bytes(30), b"\xff" * 30, b"\x01\x02\x03" * 9 + b"\x00\x00\x00"]:
+        assert bytes(decoder.decode(encoder.encode(frame))) == frame
+
+def test_unchanged_frame_is_small():
+    encoder = DeltaEncoder()
+    frame = next(frames(1, 1000))
+    encoder.encode(frame)
+    assert len(encoder.encode(frame)) < 16
+
+def test_delta_without_keyframe_is_rejected():
+    encoder = DeltaEncoder()
+    packets = [encoder.encode(frame) for frame in frames(2, 20)]
+    with pytest.raises(ValueError):
+        DeltaDecoder().decode(packets[1])
+
+def test_changed_cells():
+    a = bytearray(30)
+    b = bytearray(30)
+    b[4] = 1
+    b[27] = 9
+    assert changed_cells(a, b, 10) == [1, 9]
+    assert changed_cells(a, b, 9) == [1]
+    assert changed_cells(a, a, 10) == []
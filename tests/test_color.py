@@ -0,0 +1,45 @@
+from color import ColorPipeline, output_pipeline, table
+
+def test_tables():
+    assert table() == bytes(range(256))
+    gamma = table(2.2)
+    assert (gamma[0], gamma[255]) == (0, 255)
+    assert gamma[128] == round(255 * (128 / 255) ** 2.2)
+    assert all(a <= b for a, b in zip(gamma, gamma[1:]))
+    half = table(1.0, 0.5)
+    assert (half[0], half[100], half[255]) == (0, 50, 128)
+    assert max(table(1.0, 2.0)) == 255 # clamped
+
+def test_gains_follow_the_channel_order():
+    pipeline = ColorPipeline(gamma=1.0, gains=(1.0, 0.5, 0.25)) # red, green, blue
+    stream = bytearray([200, 100, 40] * 2) # GRB: green 200, red 100, blue 40
+    pipeline.apply(stream, "GRB")
+    assert stream == bytearray([100, 100, 10] * 2)
+    stream = bytearray([100, 200, 40])
+    pipeline.apply(stream)
+    assert stream == bytearray([100, 100, 10])
+
+def test_brightness_and_gamma_together():
+    pipeline = ColorPipeline(gamma=2.0, brightness=0.5)
+    stream = bytearray([255, 0, 128])
+    pipeline.apply(stream, "BGR")
+    assert stream == bytearray([128, 0, round(255 * (128 / 255) ** 2 * 0.5)])
+
+def test_power_limit_scales_full_white_into_the_budget():
+    pipeline = ColorPipeline(gamma=1.0, max_amps=2.0)
+    stream = bytearray([255] * 3 * 100) # 100 LEDs at 60 mA + 1 mA idle each
+    assert pipeline.estimate(stream) > 6
+    amps = pipeline.apply(stream)
+    assert amps <= 2.0
+    assert amps == pipeline.amps == pipeline.estimate(stream)
+    assert amps > 1.9 # scaled down no further than needed
+    assert pipeline.limited == 1
+    assert len(set(stream)) == 1
+    dark = bytearray([10] * 3 * 100)
+    pipeline.apply(dark)
+    assert dark == bytearray([10] * 3 * 100)
+    assert pipeline.limited == 1
+
+def test_neutral_settings_have_no_pipeline():
+    assert output_pipeline(1.0, 1.0, 0.0) is None
+    assert output_pipeline(1.0, 1.0, 5.0).max_amps == 5.0
@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+from crate_file import CODEC_DELTA, CODEC_RAW, CrateReader, CrateWriter
+
+def animation(count:int, size:int):
+    rng = random.Random(7)
+    frame = bytearray(size)
+    for _ in range(count):
+        start = rng.randrange(size)
+        frame[start:start + 9] = rng.randbytes(9)
+        del frame[size:]
+        yield bytes(frame)
+
+@pytest.mark.parametrize("codec", [CODEC_RAW, CODEC_DELTA])
+def test_round_trip(tmp_path, codec):
+    path = str(tmp_path / "show.crate")
+    frames = list(animation(70, 3 * 97))
+    with CrateWriter(path, 2, 3, 4, 4, len(frames[0]), fps=25.0, codec=codec) as writer:
+        for frame in frames:
+            writer.write(memoryview(frame))
+    with CrateReader(path) as reader:
+        assert (reader.width, reader.height, reader.crate_width, reader.crate_height, reader.fps, reader.codec) == (2, 3, 4, 4, 25.0, codec)
+        assert len(reader) == len(frames)
+        assert [bytes(frame) for frame in reader.frames()] == frames
+        # random access, backwards and across keyframes
+        for index in [69, 3, 40, 41, 0, 26]:
+            assert bytes(reader.frame(index)) == frames[index]
+        assert reader.seek_time(1.0) == 25
+
+def test_unclosed_raw_file_is_recovered(tmp_path):
+    path = str(tmp_path / "cut.crate")
+    writer = CrateWriter(path, 1, 1, 2, 2, 12)
+    for frame in animation(3, 12):
+        writer.write(frame)
+    writer.file.flush()
+    with CrateReader(path) as reader:
+        assert len(reader) == 3
+    writer.close()
+
+def test_legacy_file_takes_dimensions_from_the_name(tmp_path):
+    path = tmp_path / "Wall_0_w4_h6_cw6_ch4.crate"
+    path.write_bytes(bytes(range(30)))
+    with CrateReader(str(path)) as reader:
+        assert (reader.width, reader.height, reader.crate_width, reader.crate_height) == (4, 6, 6, 4)
+        assert len(reader) == 1
+        assert bytes(reader[0]) == bytes(range(30))
@@ -0,0 +1,39 @@
+import pytest
+
+import effects
+
+@pytest.mark.parametrize("name", list(effects.EFFECTS))
+def test_frames_cover_the_grid(name):
+    effect = effects.create(name, 7, 5)
+    frames = [bytes(frame) for frame in effects.frames(effect, count=3, numpy=False)]
+    assert len(frames) == 3
+    assert all(len(frame) >= 3 * 7 * 5 for frame in frames)
+
+@pytest.mark.skipif(effects.np is None, reason="NumPy is not installed")
+@pytest.mark.parametrize("name", [name for name, cls in effects.EFFECTS.items() if cls.field_numpy is not None])
+def test_numpy_fields_match_plain_python(name):
+    plain = [bytes(frame) for frame in effects.frames(effects.create(name, 9, 4), count=4, numpy=False)]
+    fast = [bytes(frame) for frame in effects.frames(effects.create(name, 9, 4), count=4, numpy=True)]
+    assert plain == fast
+
+def test_register_rejects_effects_without_a_field():
+    class Empty(effects.Effect):
+        name = "empty"
+    with pytest.raises(TypeError):
+        effects.register(Empty)
+    assert "empty" not in effects.EFFECTS
+
+def test_create_reports_unknown_names_only():
+    with pytest.raises(ValueError):
+        effects.create("sparkle", 4, 4)
+    class Broken(effects.Effect):
+        def __init__(self, width:int, height:int) -> None:
+            {}["missing"]
+        def field(self, t:float) -> bytes:
+            return b""
+    effects.EFFECTS["broken"] = Broken
+    try:
+        with pytest.raises(KeyError):
+            effects.create("broken", 4, 4)
+    finally:
+        del effects.EFFECTS["broken"]
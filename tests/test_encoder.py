@@ -0,0 +1,74 @@
+import io
+import random
+from array import array
+
+import pytest
+
+from encoder import FrameEncoder, new_frame
+from model import Wall
+from output_map import OutputMap, layout_order
+
+def painted_wall() -> Wall:
+    wall = Wall("Wall", 3, 2, 4, 3, "Layout1")
+    for index, crate in zip([2, 0, -1, 4, 1, 3], wall.crates): # one crate left out of the chain
+        crate.idx = index
+    wall.crates[1].layout = "Layout3"
+    wall.crates[3].extra_pixel = False
+    wall.invalidate_output_map()
+    size = 3 * wall.leds_wide * wall.leds_high
+    wall.frame[:size] = random.Random(5).randbytes(size)
+    return wall
+
+def baseline_stream(wall:Wall) -> bytes:
+    # the byte order the first version of Save wrote: crates by index, LEDs in wiring order, black for the extra pixel
+    output = b""
+    for crate in sorted(wall.crates):
+        if crate.idx < 0:
+            continue
+        for pixel in layout_order(crate.layout, crate.width, crate.height):
+            cell = wall.cell(crate, pixel % crate.width, pixel // crate.width)
+            output += bytes(wall.frame[3 * cell:3 * cell + 3])
+        if crate.extra_pixel:
+            output += b"\0\0\0"
+    return output
+
+def test_encoding_matches_the_baseline_save(tmp_path):
+    wall = painted_wall()
+    assert bytes(wall.encoder().encode(wall.frame)) == baseline_stream(wall)
+    path = wall.save(str(tmp_path / "wall.crate"))
+    with open(path, "rb") as f:
+        assert f.read() == baseline_stream(wall)
+
+def test_channel_order_is_gathered():
+    output_map = OutputMap(array("i", [1, 0, 2]), 2, 1) # cell 2 is the extra pixel
+    frame = bytearray(b"\x01\x02\x03\x04\x05\x06\x00\x00\x00")
+    assert bytes(FrameEncoder(output_map).encode(frame)) == b"\x04\x05\x06\x01\x02\x03\x00\x00\x00"
+    assert bytes(FrameEncoder(output_map, "GRB").encode(frame)) == b"\x05\x04\x06\x02\x01\x03\x00\x00\x00"
+    assert bytes(FrameEncoder(output_map, "BGR").encode(frame)) == b"\x06\x05\x04\x03\x02\x01\x00\x00\x00"
+    with pytest.raises(ValueError):
+        FrameEncoder(output_map, "RGBW")
+
+def test_encode_into_an_offset_and_write():
+    wall = painted_wall()
+    encoder = wall.encoder()
+    expected = baseline_stream(wall)
+    target = bytearray(b"\xee" * (len(expected) + 10))
+    assert encoder.encode_into(wall.frame, target, 4) == 4 + len(expected)
+    assert target == b"\xee" * 4 + expected + b"\xee" * 6
+
+    class Socket:
+        def __init__(self) -> None:
+            self.data = b""
+        def sendall(self, data) -> None:
+            self.data += bytes(data)
+    socket = Socket()
+    encoder.write(wall.frame, socket)
+    assert socket.data == expected
+    stream = io.BytesIO()
+    encoder.write(wall.frame, stream)
+    assert stream.getvalue() == expected
+
+def test_empty_output_map():
+    encoder = FrameEncoder(OutputMap(array("i"), 2, 2))
+    assert len(encoder) == 0
+    assert bytes(encoder.encode(new_frame(4))) == b""
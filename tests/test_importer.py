@@ -0,0 +1,52 @@
+import io
+import random
+
+import pytest
+
+from importer import _bounds, downsample, read_ppm, read_raw, resample
+
+def reference(rgb:bytes, width:int, height:int, target_width:int, target_height:int) -> bytes:
+    # plain area average of the source pixels under every target cell
+    output = bytearray()
+    for ty in range(target_height):
+        y0 = ty * height // target_height
+        y1 = max((ty + 1) * height // target_height, y0 + 1)
+        for tx in range(target_width):
+            x0 = tx * width // target_width
+            x1 = max((tx + 1) * width // target_width, x0 + 1)
+            for channel in range(3):
+                values = [rgb[3 * (x + y * width) + channel] for y in range(y0, y1) for x in range(x0, x1)]
+                output.append(sum(values) // len(values))
+    return bytes(output)
+
+@pytest.mark.parametrize("size", [(8, 6, 4, 3), (7, 5, 3, 2), (10, 3, 10, 3), (3, 2, 7, 5), (600, 2, 4, 1), (5, 300, 2, 1), (1, 1, 1, 1)])
+def test_downsample_is_an_area_average(size):
+    width, height, target_width, target_height = size
+    rgb = random.Random(width * height).randbytes(3 * width * height)
+    assert downsample(rgb, width, height, target_width, target_height) == reference(rgb, width, height, target_width, target_height)
+
+def test_bounds_cover_at_least_one_pixel_when_upscaling():
+    assert _bounds(2, 4) == [(0, 1), (0, 1), (1, 2), (1, 2)]
+    assert _bounds(4, 2) == [(0, 2), (2, 4)]
+
+def test_read_ppm():
+    data = (b"P6\n# made by hand\n2 1\n255\n" + bytes(range(6))
+            + b"P6 1 1 127 " + b"\x00\x7f\x40"
+            + b"P6 2 2 255\n" + b"\x01" * 5) # truncated
+    frames = list(read_ppm(io.BytesIO(data)))
+    assert frames == [(bytes(range(6)), 2, 1), (bytes([0, 255, 0x40 * 255 // 127]), 1, 1)]
+
+def test_read_ppm_rejects_other_formats():
+    with pytest.raises(ValueError):
+        list(read_ppm(io.BytesIO(b"P3 1 1 255 0 0 0")))
+    with pytest.raises(ValueError):
+        list(read_ppm(io.BytesIO(b"P6 1 1 65535 " + bytes(6))))
+
+def test_read_raw_stops_at_a_partial_frame():
+    data = bytes(range(3 * 4)) * 2 + b"\x01\x02"
+    assert list(read_raw(io.BytesIO(data), 2, 2)) == [(bytes(range(12)), 2, 2)] * 2
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_resample_keeps_the_order(workers):
+    frames = [(bytes([index]) * 3 * 16, 4, 4) for index in range(9)]
+    assert list(resample(iter(frames), 2, 2, workers=workers)) == [bytes([index]) * 12 for index in range(9)]
@@ -0,0 +1,36 @@
+import pytest
+
+from output_map import LAYOUTS, compile_output_map, layout_order
+
+def test_every_layout_visits_every_led_once():
+    for layout in LAYOUTS:
+        for width, height in [(1, 1), (6, 4), (4, 6), (5, 5)]:
+            assert sorted(layout_order(layout, width, height)) == list(range(width * height))
+
+def test_layout_wiring_is_serpentine():
+    # consecutive LEDs of a chain are always neighbours on the crate
+    for layout in LAYOUTS:
+        order = layout_order(layout, 6, 4)
+        for a, b in zip(order, order[1:]):
+            assert abs(a % 6 - b % 6) + abs(a // 6 - b // 6) == 1
+
+def test_layout1_starts_bottom_left():
+    assert layout_order("Layout1", 3, 2) == (3, 4, 5, 2, 1, 0)
+
+def test_crates_are_chained_by_index_with_extra_pixels():
+    # two crates of 2x1 side by side, the right one first in the chain
+    output_map = compile_output_map([(1, 0, 0, "Layout2", True), (0, 1, 0, "Layout2", False), (-1, 0, 1, "Layout2", True)], 2, 2, 2, 1)
+    size = output_map.width * output_map.height
+    assert list(output_map.cells) == [2, 3, 0, 1, size]
+    assert len(output_map) == 5
+
+def test_duplicate_index_is_rejected():
+    with pytest.raises(ValueError):
+        compile_output_map([(0, 0, 0, "Layout1", True), (0, 1, 0, "Layout1", True)], 2, 1, 2, 2)
+
+def test_translate_into_a_larger_canvas():
+    output_map = compile_output_map([(0, 0, 0, "Layout2", True)], 1, 1, 2, 2)
+    moved = output_map.translate(3, 1, 8, 4)
+    assert list(moved.cells) == [3 + 8, 4 + 8, 4 + 16, 3 + 16, 32]
+    with pytest.raises(ValueError):
+        output_map.translate(7, 0, 8, 4)
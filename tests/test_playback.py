@@ -0,0 +1,72 @@
+import threading
+import time
+
+from playback import Player, RingBuffer
+
+def slow(frames:int, fps:float):
+    # a source that decodes frames at fps, after a quick start
+    for index in range(frames):
+        if index >= 4:
+            time.sleep(1 / fps)
+        yield bytes([index]) * 3
+
+def test_every_frame_of_a_slow_source_is_output():
+    output = []
+    player = Player(slow(30, 25), lambda frame: output.append(frame[0]), 30, 3, slots=4)
+    player.run()
+    assert player.error is None
+    assert output == list(range(30))
+    assert player.metrics.frames == 30
+    assert player.metrics.rebased
+
+def test_frames_are_output_in_order_at_the_rate():
+    output = []
+    player = Player([bytes([index]) * 3 for index in range(20)], lambda frame: output.append((time.monotonic(), frame[0])), 100, 3)
+    player.run()
+    assert [index for _, index in output] == list(range(20))
+    assert player.metrics.rebased == 0
+    assert 0.19 - 0.02 < output[-1][0] - output[0][0] < 0.19 + 0.05
+
+def test_ring_is_filled_before_the_clock_starts():
+    def warm_up():
+        time.sleep(0.1) # eg opening a file or a process pool
+        for index in range(8):
+            yield bytes([index])
+    player = Player(warm_up(), None, 100, 1, slots=4)
+    player.run()
+    assert player.metrics.frames == 8
+    assert player.metrics.rebased == 0
+    assert player.metrics.underruns == 0
+
+def test_ring_buffer_hands_out_frames_in_order():
+    ring = RingBuffer(3, 1)
+    stop = threading.Event()
+    for index in range(3):
+        ring.writable(stop)[0] = index
+        ring.commit()
+    ring.filled(stop) # returns at once, every slot holds a frame
+    output = []
+    while not ring.finished():
+        output.append(ring.readable(0)[0])
+        ring.release()
+        if len(output) == 2:
+            ring.close()
+    assert output == [0, 1, 2]
+    assert ring.readable(0) is None
+
+def test_a_stalled_sink_skips_frames_and_stays_on_schedule():
+    output = []
+    def sink(frame):
+        output.append((time.monotonic(), frame[0]))
+        if frame[0] == 5:
+            time.sleep(0.1) # eg a blocking send, ten frame periods
+    player = Player([bytes([index]) * 3 for index in range(40)], sink, 100, 3, slots=16)
+    player.run()
+    indices = [index for _, index in output]
+    assert indices[:6] == list(range(6))
+    assert indices[-1] == 39
+    assert player.metrics.dropped
+    assert player.metrics.rebased == 0
+    start = output[0][0]
+    for when, index in output[6:]:
+        assert abs(when - (start + index / 100)) < 0.005
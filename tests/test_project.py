@@ -0,0 +1,65 @@
+import struct
+
+import pytest
+
+import project
+from color import ColorPipeline
+from model import Wall
+
+def painted_wall(name:str) -> Wall:
+    wall = Wall(name, 3, 2, 4, 3, "Layout1")
+    for index, crate in enumerate(wall.crates):
+        crate.idx = index
+    wall.crates[1].change_layout("Layout2")
+    wall.crates[2].extra_pixel = False
+    size = 3 * wall.leds_wide * wall.leds_high
+    wall.frame[:size] = bytes(value % 251 for value in range(size))
+    wall.color = (1, 2, 3)
+    return wall
+
+def test_round_trip_with_output_settings(tmp_path):
+    walls = [painted_wall("Left"), painted_wall("Right")]
+    walls[1].set_output("GRB", ColorPipeline(gamma=2.2, brightness=0.5, max_amps=4.0))
+    path = tmp_path / "show.cratelight"
+    path.write_bytes(project.pack(walls))
+    for wall, snapshot in zip(walls, project.load(str(path))):
+        restored = Wall.from_snapshot(snapshot)
+        assert restored.name == wall.name
+        assert restored.color == wall.color
+        assert restored.frame == wall.frame
+        assert [(crate.idx, crate.layout, crate.extra_pixel) for crate in restored.crates] == [(crate.idx, crate.layout, crate.extra_pixel) for crate in wall.crates]
+        assert restored.channel_order == wall.channel_order
+        assert restored.encoder().encode(restored.frame) == wall.encoder().encode(wall.frame)
+    assert Wall.from_snapshot(project.load(str(path))[0]).pipeline is None
+
+def test_patches_match_a_full_rewrite(tmp_path):
+    walls = [painted_wall("Left"), painted_wall("Right")]
+    path = tmp_path / "show.cratelight"
+    path.write_bytes(project.pack(walls))
+    walls[1].frame[0:3] = b"\xff\xff\xff"
+    walls[1].set_output("BGR", ColorPipeline(gamma=1.8))
+    data = bytearray(path.read_bytes())
+    for offset, block in project.patches(walls, {1: {0}}):
+        data[offset:offset + len(block)] = block
+    assert data == project.pack(walls)
+
+def test_version_1_files_are_read_with_default_output_settings(tmp_path):
+    wall = painted_wall("Old")
+    data = [project.HEADER.pack(project.MAGIC, 1, 1), project.WALL_HEADER_V1.pack(b"Old", 3, 2, 4, 3, 0, bytes(wall.color))]
+    data.extend(project.crate_block(wall, crate) for crate in wall.crates)
+    path = tmp_path / "old.cratelight"
+    path.write_bytes(b"".join(data))
+    snapshot, = project.load(str(path))
+    assert snapshot.version == 1
+    assert (snapshot.channel_order, snapshot.gamma, snapshot.brightness, snapshot.max_amps) == ("RGB", 1.0, 1.0, 0.0)
+    assert Wall.from_snapshot(snapshot).frame == wall.frame
+
+def test_truncated_and_foreign_files_raise_value_error(tmp_path):
+    path = tmp_path / "show.cratelight"
+    data = project.pack([painted_wall("Left")])
+    path.write_bytes(data[:-5])
+    with pytest.raises(ValueError):
+        project.load(str(path))
+    path.write_bytes(struct.pack("<4sHH", b"ABCD", 1, 0))
+    with pytest.raises(ValueError):
+        project.load(str(path))
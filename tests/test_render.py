@@ -0,0 +1,51 @@
+import pytest
+
+import project
+import render
+from model import Wall
+
+def test_select_wall_by_name_or_index():
+    snapshots = project.WallSnapshot("Left", 1, 1, 2, 2, "Layout1", (0, 0, 0)), project.WallSnapshot("Right", 1, 1, 2, 2, "Layout1", (0, 0, 0))
+    assert render.select_wall(list(snapshots), None) is snapshots[0]
+    assert render.select_wall(list(snapshots), "Right") is snapshots[1]
+    assert render.select_wall(list(snapshots), "1") is snapshots[1]
+    with pytest.raises(ValueError):
+        render.select_wall(list(snapshots), "Middle")
+
+def test_project_without_walls_is_an_error(tmp_path, capsys):
+    path = tmp_path / "empty.cratelight"
+    path.write_bytes(project.pack([]))
+    assert render.main([str(path)]) == 1
+    assert "no walls" in capsys.readouterr().err
+
+def test_channel_order_is_checked_and_case_insensitive(tmp_path):
+    wall = Wall("Wall", 1, 1, 2, 2, "Layout1")
+    wall.crates[0].idx = 0
+    path = tmp_path / "show.cratelight"
+    path.write_bytes(project.pack([wall]))
+    with pytest.raises(SystemExit):
+        render.main([str(path), "--order", "XYZ"])
+    output = tmp_path / "out.crate"
+    assert render.main([str(path), "--order", "grb", "--effect", "fade", "--duration", "0.1", "-o", str(output)]) == 0
+    assert output.exists()
+
+@pytest.mark.parametrize("option", [["--gamma", "-1"], ["--gamma", "0"], ["--brightness", "-2"], ["--brightness", "1.5"],
+                                    ["--max-amps", "-1"], ["--fps", "0"], ["--fps", "-5"], ["--fps", "nan"], ["--gamma", "x"]])
+def test_output_settings_and_fps_are_checked(tmp_path, capsys, option):
+    wall = Wall("Wall", 1, 1, 2, 2, "Layout1")
+    wall.crates[0].idx = 0
+    path = tmp_path / "show.cratelight"
+    path.write_bytes(project.pack([wall]))
+    with pytest.raises(SystemExit) as exit:
+        render.main([str(path), "--effect", "plasma", "-o", str(tmp_path / "out.crate"), *option])
+    assert exit.value.code == 2
+    assert f"argument {option[0]}" in capsys.readouterr().err
+    assert not (tmp_path / "out.crate").exists()
+
+def test_delta_output_reports_the_codec(tmp_path, capsys):
+    wall = Wall("Wall", 1, 1, 2, 2, "Layout1")
+    wall.crates[0].idx = 0
+    path = tmp_path / "show.cratelight"
+    path.write_bytes(project.pack([wall]))
+    assert render.main([str(path), "--effect", "fade", "--duration", "0.5", "--delta", "-o", str(tmp_path / "out.crate")]) == 0
+    assert "delta coded: 15 frames, ratio" in capsys.readouterr().err
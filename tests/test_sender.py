@@ -0,0 +1,99 @@
+import asyncio
+import random
+import socket
+import threading
+import time
+
+import pytest
+
+from codec import DeltaDecoder
+from receiver import Stats, UdpReceiver, handle_tcp
+from sender import CHUNK_SIZE, FrameSender, parse_target
+
+class Recorder(Stats):
+    # keeps every frame it receives, decoded if they are compressed
+    def __init__(self, compressed:bool=False) -> None:
+        super().__init__(compressed)
+        self.received = []
+        self.codec = DeltaDecoder() if compressed else None
+
+    def frame(self, sequence:int, sent:float, data:bytes) -> None:
+        super().frame(sequence, sent, data)
+        self.received.append(bytes(self.codec.decode(data)) if self.codec is not None else data)
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield loop
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+def listen(loop, protocol:str, stats:Stats) -> int:
+    # port of a receiver on the loopback interface, served from loop
+    async def start():
+        if protocol == "udp":
+            transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(lambda: UdpReceiver(stats), local_addr=("127.0.0.1", 0))
+            return transport.get_extra_info("sockname")[1]
+        server = await asyncio.start_server(lambda reader, writer: handle_tcp(stats, reader, writer), "127.0.0.1", 0)
+        return server.sockets[0].getsockname()[1]
+    return asyncio.run_coroutine_threadsafe(start(), loop).result(timeout=5)
+
+def send(protocol:str, port:int, frames:list[bytes], stats:Recorder, compress:bool=False) -> None:
+    sender = FrameSender("127.0.0.1", port, fps=0, protocol=protocol, compress=compress)
+    sender.start()
+    try:
+        for frame in frames:
+            count = len(stats.received)
+            sender.submit(frame)
+            deadline = time.monotonic() + 5
+            while len(stats.received) == count and sender.running() and time.monotonic() < deadline:
+                time.sleep(0.001)
+        assert sender.error is None
+        assert sender.sent == len(frames)
+    finally:
+        sender.stop()
+
+def animation(size:int, count:int) -> list[bytes]:
+    rng = random.Random(size)
+    frame = bytearray(rng.randbytes(size))
+    frames = []
+    for _ in range(count):
+        start = rng.randrange(size - 30)
+        frame[start:start + 30] = rng.randbytes(30)
+        frames.append(bytes(frame))
+    return frames
+
+@pytest.mark.parametrize("protocol", ["udp", "tcp"])
+@pytest.mark.parametrize("compress", [False, True])
+def test_frames_arrive_whole_and_in_order(loop, protocol, compress):
+    stats = Recorder(compress)
+    port = listen(loop, protocol, stats)
+    frames = animation(3 * 1500, 12) # 1500 LEDs
+    assert len(frames[0]) > 3 * CHUNK_SIZE # several datagrams per frame over UDP
+    send(protocol, port, frames, stats, compress)
+    assert stats.received == frames
+    assert stats.lost == 0
+
+def test_refused_tcp_connection_sets_error():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1] # nothing listens on it once the probe is closed
+    sender = FrameSender("127.0.0.1", port, protocol="tcp")
+    sender.start()
+    try:
+        deadline = time.monotonic() + 5
+        while sender.running() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert not sender.running()
+        assert isinstance(sender.error, OSError)
+    finally:
+        sender.stop()
+
+def test_parse_target():
+    assert parse_target("raspberrypi.local") == ("udp", "raspberrypi.local", 7777)
+    assert parse_target("tcp://10.0.0.2:9000") == ("tcp", "10.0.0.2", 9000)
+    with pytest.raises(ValueError):
+        FrameSender("127.0.0.1", protocol="sctp")
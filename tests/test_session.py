@@ -0,0 +1,31 @@
+import random
+
+from model import Wall
+from session import Session
+
+def indexed_wall(name:str, width:int) -> Wall:
+    wall = Wall(name, width, 2, 4, 3, "Layout1")
+    for index, crate in enumerate(wall.crates):
+        crate.idx = index
+    return wall
+
+def test_walls_side_by_side_get_their_region_of_the_canvas():
+    walls = [indexed_wall("Left", 2), indexed_wall("Right", 3)]
+    walls[1].set_output("GRB", None)
+    output = {wall.name: [] for wall in walls}
+    width, height = sum(wall.leds_wide for wall in walls), walls[0].leds_high
+    with Session(width, height) as session:
+        x = 0
+        for wall in walls:
+            session.add(wall.output_map(), x, 0, lambda frame, name=wall.name: output[name].append(bytes(frame)), wall.channel_order, wall.pipeline)
+            x += wall.leds_wide
+        canvas = session.new_frame()
+        canvas[:3 * width * height] = random.Random(3).randbytes(3 * width * height)
+        session.render(canvas)
+    x = 0
+    for wall in walls:
+        for row in range(wall.leds_high):
+            start = 3 * (x + row * width)
+            wall.frame[3 * row * wall.leds_wide:3 * (row + 1) * wall.leds_wide] = canvas[start:start + 3 * wall.leds_wide]
+        assert output[wall.name] == [bytes(wall.encoder().encode(wall.frame))]
+        x += wall.leds_wide
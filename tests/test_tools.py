@@ -0,0 +1,99 @@
+import itertools
+
+from tools import Journal, flood_fill, line, rectangle
+
+WIDTH, HEIGHT = 16, 12
+
+def cells_of(points):
+    return [x + y * WIDTH for x, y in points]
+
+def test_line_ends_on_both_points():
+    for x0, y0, x1, y1 in itertools.product(range(6), range(5), range(6), range(5)):
+        cells = line(x0, y0, x1, y1, WIDTH)
+        assert cells[0] == x0 + y0 * WIDTH
+        assert cells[-1] == x1 + y1 * WIDTH
+        assert len(cells) == max(abs(x1 - x0), abs(y1 - y0)) + 1
+
+def test_line_steps_are_connected():
+    for x0, y0, x1, y1 in [(0, 0, 4, 2), (5, 4, 0, 0), (0, 3, 5, 0), (2, 0, 2, 4)]:
+        points = [(cell % WIDTH, cell // WIDTH) for cell in line(x0, y0, x1, y1, WIDTH)]
+        for (ax, ay), (bx, by) in zip(points, points[1:]):
+            assert max(abs(ax - bx), abs(ay - by)) == 1
+
+def test_line_shallow_diagonal():
+    assert line(0, 0, 4, 2, WIDTH) == cells_of([(0, 0), (1, 1), (2, 1), (3, 2), (4, 2)])
+
+def test_rectangle_is_filled_in_any_corner_order():
+    expected = cells_of([(x, y) for y in range(1, 4) for x in range(2, 6)])
+    assert sorted(rectangle(2, 1, 5, 3, WIDTH)) == expected
+    assert sorted(rectangle(5, 3, 2, 1, WIDTH)) == expected
+
+def test_flood_fill_stops_at_other_colors_and_mask():
+    frame = bytearray(3 * WIDTH * HEIGHT)
+    for cell in line(8, 0, 8, HEIGHT - 1, WIDTH): # a wall splitting the grid in two
+        frame[3 * cell:3 * cell + 3] = b"\xff\xff\xff"
+    assert sorted(flood_fill(frame, WIDTH, HEIGHT, 0, 0)) == cells_of([(x, y) for y in range(HEIGHT) for x in range(8)])
+    allowed = bytearray(WIDTH * HEIGHT)
+    for cell in rectangle(0, 0, 3, 3, WIDTH):
+        allowed[cell] = 1
+    assert sorted(flood_fill(frame, WIDTH, HEIGHT, 1, 1, allowed)) == sorted(rectangle(0, 0, 3, 3, WIDTH))
+
+def test_flood_fill_of_a_uniform_grid_covers_it_once():
+    cells = flood_fill(bytearray(3 * WIDTH * HEIGHT), WIDTH, HEIGHT, 5, 5)
+    assert sorted(cells) == list(range(WIDTH * HEIGHT))
+
+def test_journal_undo_redo_round_trip():
+    frame = bytearray(3 * WIDTH * HEIGHT)
+    journal = Journal()
+    states = [bytes(frame)]
+    journal.paint(frame, rectangle(0, 0, 3, 3, WIDTH), b"\x10\x20\x30")
+    states.append(bytes(frame))
+    journal.paint(frame, flood_fill(frame, WIDTH, HEIGHT, 10, 10), b"\x01\x02\x03")
+    states.append(bytes(frame))
+    journal.record(frame, [0, 1], b"\xaa\xaa\xaa\xbb\xbb\xbb")
+    frame[0:6] = b"\xaa\xaa\xaa\xbb\xbb\xbb"
+    states.append(bytes(frame))
+    for state in reversed(states[:-1]):
+        assert journal.undo(frame) is not None
+        assert frame == state
+    assert journal.undo(frame) is None
+    for state in states[1:]:
+        journal.redo(frame)
+        assert frame == state
+    assert journal.redo(frame) is None
+
+def test_journal_stroke_is_one_edit():
+    frame = bytearray(3 * WIDTH * HEIGHT)
+    journal = Journal()
+    journal.begin_stroke()
+    assert journal.paint(frame, line(0, 0, 4, 2, WIDTH), b"\xff\x00\x00")
+    assert journal.paint(frame, line(0, 0, 4, 2, WIDTH), b"\xff\x00\x00") == [] # nothing new
+    journal.paint(frame, line(4, 2, 8, 2, WIDTH), b"\xff\x00\x00")
+    journal.end_stroke()
+    assert len(journal.undo_stack) == 1
+    journal.undo(frame)
+    assert frame == bytes(3 * WIDTH * HEIGHT)
+
+def test_journal_new_edit_clears_redo_and_evicts_oldest():
+    frame = bytearray(3 * WIDTH * HEIGHT)
+    journal = Journal(limit=100)
+    for cell in range(50):
+        journal.paint(frame, [cell], bytes([cell + 1]) * 3)
+    assert journal.size <= 100
+    assert sum(edit.size() for edit in journal.undo_stack) == journal.size
+    journal.undo(frame)
+    journal.paint(frame, [60], b"\x01\x01\x01")
+    assert not journal.redo_stack
+    assert sum(edit.size() for edit in journal.undo_stack) == journal.size
+
+def test_loading_an_identical_frame_is_no_edit():
+    from model import Wall
+    wall = Wall("Wall", 1, 1, 2, 2, "Layout1")
+    wall.journal.paint(wall.frame, [0], b"\x10\x20\x30")
+    wall.journal.undo(wall.frame)
+    assert wall.load_frame(bytes(12)) == []
+    assert len(wall.journal.redo_stack) == 1
+    assert not wall.journal.undo_stack
+    assert not wall.dirty
+    assert wall.load_frame(b"\x01" * 12) == [0, 1, 2, 3]
+    assert len(wall.journal.undo_stack) == 1
@@ -0,0 +1,162 @@
+from array import array
+from collections import deque
+
+# Painting tools and their undo history, on the frame of a Wall: cells are indices (x + y * width) of LEDs of the
+# wall, colors are 3 bytes of rgb. Every tool produces all of its cells first, they are then applied in one go.
+
+TOOLS = ("Brush", "Line", "Rectangle", "Fill")
+
+def line(x0:int, y0:int, x1:int, y1:int, width:int) -> list[int]:
+    # Bresenham, both ends included
+    cells = []
+    dx, dy = abs(x1 - x0), -abs(y1 - y0)
+    sx, sy = (1 if x0 < x1 else -1), (1 if y0 < y1 else -1)
+    error = dx + dy
+    while True:
+        cells.append(x0 + y0 * width)
+        if x0 == x1 and y0 == y1:
+            return cells
+        e2 = 2 * error # both steps are decided on the error before either of them
+        if e2 >= dy:
+            error += dy
+            x0 += sx
+        if e2 <= dx:
+            error += dx
+            y0 += sy
+
+def rectangle(x0:int, y0:int, x1:int, y1:int, width:int) -> list[int]:
+    # filled, both corners included
+    x0, x1 = min(x0, x1), max(x0, x1)
+    cells = []
+    for y in range(min(y0, y1), max(y0, y1) + 1):
+        cells.extend(range(x0 + y * width, x1 + 1 + y * width))
+    return cells
+
+def flood_fill(frame:bytearray, width:int, height:int, x:int, y:int, allowed:bytearray|None=None) -> list[int]:
+    # scanline fill of the 4-connected area of the same color, allowed masks out cells that must not be painted
+    start = 3 * (x + y * width)
+    target = frame[start:start + 3]
+    seen = bytearray(width * height)
+    def fits(cell:int) -> bool:
+        return not seen[cell] and (allowed is None or allowed[cell]) and frame[3 * cell:3 * cell + 3] == target
+    cells = []
+    stack = [(x, y)]
+    while stack:
+        x, y = stack.pop()
+        row = y * width
+        if not fits(row + x):
+            continue
+        left = x
+        while left > 0 and fits(row + left - 1):
+            left -= 1
+        right = x
+        while right < width - 1 and fits(row + right + 1):
+            right += 1
+        for cell in range(row + left, row + right + 1):
+            seen[cell] = 1
+        cells.extend(range(row + left, row + right + 1))
+        for ny in (y - 1, y + 1):
+            if 0 <= ny < height:
+                inside = False
+                for nx in range(left, right + 1):
+                    if fits(nx + ny * width):
+                        if not inside:
+                            stack.append((nx, ny))
+                            inside = True
+                    else:
+                        inside = False
+    return cells
+
+def fill(frame:bytearray, cells, color:bytes) -> None:
+    for cell in cells:
+        frame[3 * cell:3 * cell + 3] = color
+
+class Edit:
+    # one undoable operation: cells it changed, their previous colors and either one new color or one per cell
+    def __init__(self, cells:array, old:bytearray, new:bytes) -> None:
+        self.cells = cells
+        self.old = old
+        self.new = new
+        self.open = False # a brush stroke keeps extending its edit until the button is released
+
+    def size(self) -> int:
+        return self.cells.itemsize * len(self.cells) + len(self.old) + len(self.new)
+
+    def apply(self, frame:bytearray, colors:bytes) -> None:
+        if len(colors) == 3:
+            fill(frame, self.cells, colors)
+        else:
+            for i, cell in enumerate(self.cells):
+                frame[3 * cell:3 * cell + 3] = colors[3 * i:3 * i + 3]
+
+class Journal:
+    def __init__(self, limit:int=8 << 20) -> None:
+        self.limit = limit       # bytes of history kept, undo and redo together, the oldest edits are evicted first
+        self.size = 0
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.stroke = False      # edits are merged into one until end_stroke()
+
+    def paint(self, frame:bytearray, cells, color:bytes) -> list[int]:
+        # paint cells with one color as a single edit, returns the cells that actually changed
+        color = bytes(color)
+        top = self.undo_stack[-1] if self.undo_stack else None
+        edit = top if top is not None and top.open and top.new == color else None
+        known = set(edit.cells) if edit is not None else ()
+        changed = [cell for cell in dict.fromkeys(cells) if cell not in known and frame[3 * cell:3 * cell + 3] != color]
+        if not changed:
+            return changed
+        old = b"".join(frame[3 * cell:3 * cell + 3] for cell in changed)
+        if edit is None:
+            edit = Edit(array("i"), bytearray(), color)
+            self._push(edit)
+        self.size -= edit.size()
+        edit.cells.extend(changed)
+        edit.old += old
+        self.size += edit.size()
+        fill(frame, changed, color)
+        self._evict()
+        return changed
+
+    def record(self, frame:bytearray, cells, new:bytes) -> None:
+        # an edit the caller applies itself, new holds the color of every cell
+        self._push(Edit(array("i", cells), bytearray(b"".join(frame[3 * cell:3 * cell + 3] for cell in cells)), bytes(new)))
+        self._evict()
+
+    def begin_stroke(self) -> None:
+        self.end_stroke()
+        self.stroke = True
+
+    def end_stroke(self) -> None:
+        if self.undo_stack:
+            self.undo_stack[-1].open = False
+        self.stroke = False
+
+    def _push(self, edit:Edit) -> None:
+        if self.undo_stack:
+            self.undo_stack[-1].open = False
+        edit.open = self.stroke
+        self.undo_stack.append(edit)
+        self.size += edit.size() - sum(undone.size() for undone in self.redo_stack)
+        self.redo_stack.clear()
+
+    def _evict(self) -> None:
+        while self.size > self.limit and len(self.undo_stack) > 1:
+            self.size -= self.undo_stack.popleft().size()
+
+    def undo(self, frame:bytearray) -> array|None:
+        if not self.undo_stack:
+            return None
+        edit = self.undo_stack.pop()
+        edit.open = False
+        edit.apply(frame, edit.old)
+        self.redo_stack.append(edit)
+        return edit.cells
+
+    def redo(self, frame:bytearray) -> array|None:
+        if not self.redo_stack:
+            return None
+        edit = self.redo_stack.pop()
+        edit.apply(frame, edit.new)
+        self.undo_stack.append(edit)
+        return edit.cells